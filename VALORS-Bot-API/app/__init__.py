@@ -1,20 +1,27 @@
 from fastapi import FastAPI
 from .models import init_db, init_models
-from .discord import init_discord
+from .discord import init_discord, get_client
 from .routes import init_routes
-import aioredis
 from datetime import datetime, timezone
 from .utils.logger import log
+from .utils.session_cache import session_cache
+from .services.leaderboard import leaderboard_snapshot
+from .services.commands import command_catalogue
+from .services.update_jobs import update_jobs
+from .utils.discord_rest import discord_rest
+from .utils.encoding import FastJSONResponse
+from .utils.images import logo_variants
+from .utils.metrics import InstrumentedRedis, count_db_calls, metrics
+from .utils import query_stats
 from config import config
 from .middleware import (
-    AsyncDBSessionMiddleware, 
-    SessionTokenMiddleware, AuthorizationTokenMiddleware, 
+    MetricsMiddleware, RequestPipelineMiddleware, RouteTable, UploadLimitMiddleware,
     add_cors_middleware, 
     add_exception_handler
 )
 
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(default_response_class=FastJSONResponse)
     
     # Add middlewares
     add_cors_middleware(app)
@@ -26,38 +33,70 @@ def create_app() -> FastAPI:
     # Initialize database
     @app.on_event("startup")
     async def startup_event():
-        await init_db(app, config.DATABASE_URL)
+        await init_db(app, config.DATABASE_URL,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING)
+        count_db_calls(app.state.engine)
+        query_stats.instrument_engine(app.state.engine)
         await init_models(app.state.engine)
         await init_discord()
+        await session_cache.start()
+        await leaderboard_snapshot.start(app.state.AsyncSessionLocal)
+        await command_catalogue.start()
+        await metrics.start()
+        logo_variants.start()
     
-    # Add DB Session Middleware
-    app.add_middleware(AsyncDBSessionMiddleware)
-
-    # Add Authorization Middleware
-    app.add_middleware(AuthorizationTokenMiddleware, 
-        whitelist_patterns=[
-            r"^/user",
-            r"^/team",
-            r"^/session",
-            r"^/guild",
-            r"^/matchmaking"
-        ])
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await session_cache.stop()
+        await leaderboard_snapshot.stop()
+        await command_catalogue.stop()
+        await metrics.stop()
+        await update_jobs.stop()
+        await logo_variants.stop()
+        await discord_rest.close()
+    
+    # Inside the pipeline, so unauthenticated uploads get their 401 first
+    app.add_middleware(UploadLimitMiddleware, paths=["/team/update"], max_bytes=config.UPLOAD_MAX_BYTES)
 
-    # Add Session Token Middleware
-    app.add_middleware(SessionTokenMiddleware, 
-        whitelist_patterns=[
-            r"^/user/me",
-            r"^/user/roles",
-            r"^/user/all",
-            r"^/user/\d+",
+    # Add request pipeline (API token, session token and DB session scoping)
+    app.add_middleware(RequestPipelineMiddleware, routes=RouteTable(
+        api_token_prefixes=[
+            "/user",
+            "/team",
+            "/session",
+            "/guild",
+            "/matchmaking",
+            "/internal",
+            "/metrics"
+        ],
+        session_prefixes=[
+            "/user/me",
+            "/user/roles",
+            "/user/all",
+            "/user/search",
             
-            r"^/team/",
+            "/team/",
             
-            r"^/session/check"
-        ])
+            "/session/check"
+        ],
+        session_id_prefixes=[
+            "/user/"
+        ]))
     
     # Initialize Redis
-    app.redis_db = aioredis.from_url(f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}", decode_responses=True)
+    app.redis_db = InstrumentedRedis.from_url(f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}", decode_responses=True)
+    session_cache.bind(app.redis_db)
+    command_catalogue.bind(app.redis_db)
+    metrics.bind(app.redis_db)
+    update_jobs.bind(app.redis_db)
+    get_client().bind_avatar_cache(app.redis_db)
+    
+    # Outermost, so latency covers the whole stack
+    app.add_middleware(MetricsMiddleware)
     
     # Initialize routes
     init_routes(app)
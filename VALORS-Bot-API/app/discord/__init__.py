@@ -1,11 +1,15 @@
+import asyncio
 import time
 import json
 
+from typing import Dict, Iterable, List, Optional, Set
 from aioredis import Redis
 import nextcord
 from datetime import datetime
 from config import config
 from ..utils.logger import log
+from ..utils.discord import get_all_guild_members
+from ..services.members import member_snapshot
 
 class DiscordClient(nextcord.Client):
     def __init__(self, *args, **kwargs):
@@ -13,10 +17,22 @@ class DiscordClient(nextcord.Client):
         self.guild = None
         self.AVATAR_CACHE_TTL = 24 * 60 * 60  # 24 hours in seconds
         self.AVATAR_UPDATE_INTERVAL = 24 * 60 * 60  # 24 hours in seconds
+        self.member_names: Dict[int, str] = {}
+        self.avatar_cache: Optional[Redis] = None
+        self._avatar_refreshes: Dict[int, asyncio.Task] = {}
+        self._avatar_fetches: Optional[asyncio.Semaphore] = None
+        self._background: Set[asyncio.Task] = set()
+
+    def bind_avatar_cache(self, cache: Redis):
+        self.avatar_cache = cache
 
     async def on_ready(self):
         self.guild = self.get_guild(config.DISCORD_GUILD_ID)
         if self.guild:
+            self.member_names = {member.id: member.nick or member.name for member in self.guild.members}
+            # Records embed ranks, without them the first /guild/members builds the snapshot
+            if member_snapshot.ranks.loaded:
+                member_snapshot.rebuild(self.guild.members)
             log.info(f'Logged in as {self.user.name} (ID: {self.user.id}) at {datetime.now()}')
         else:
             log.warning(f"Logged in as {self.user.name} (ID: {self.user.id}) but Warning: Guild with ID {config.DISCORD_GUILD_ID} not found")
@@ -24,42 +40,146 @@ class DiscordClient(nextcord.Client):
     async def process_application_commands(*args):
         pass
 
+    def _index_member(self, member: nextcord.Member):
+        if member.guild.id == config.DISCORD_GUILD_ID:
+            self.member_names[member.id] = member.nick or member.name
+            member_snapshot.upsert(member)
+
+    async def on_member_join(self, member: nextcord.Member):
+        self._index_member(member)
+
+    async def on_member_update(self, before: nextcord.Member, after: nextcord.Member):
+        self._index_member(after)
+        if after.guild.id == config.DISCORD_GUILD_ID and before.display_avatar != after.display_avatar:
+            self._store_avatar_in_background(after)
+
+    async def on_member_remove(self, member: nextcord.Member):
+        if member.guild.id == config.DISCORD_GUILD_ID:
+            self.member_names.pop(member.id, None)
+            member_snapshot.remove(member.id)
+
+    async def on_user_update(self, before: nextcord.User, after: nextcord.User):
+        member = self.guild.get_member(after.id) if self.guild else None
+        if member:
+            self._index_member(member)
+        if before.display_avatar != after.display_avatar:
+            self._store_avatar_in_background(member or after)
+
+    async def on_presence_update(self, before: nextcord.Member, after: nextcord.Member):
+        if after.guild.id == config.DISCORD_GUILD_ID:
+            member_snapshot.upsert(after)
+
+    async def on_guild_role_update(self, before: nextcord.Role, after: nextcord.Role):
+        # Role names, colors and icons are part of every holder's record
+        if after.guild.id == config.DISCORD_GUILD_ID:
+            for member in after.members:
+                member_snapshot.upsert(member)
+
+    async def on_guild_role_delete(self, role: nextcord.Role):
+        if role.guild.id == config.DISCORD_GUILD_ID and self.guild and member_snapshot.ready:
+            member_snapshot.rebuild(self.guild.members)
+
+    @staticmethod
+    def _avatar_key(user_id: int) -> str:
+        return f'discord_avatar:{user_id}'
+
     async def get_avatar_url(self, cache: Redis, user_id: int) -> str:
-        cache_key = f'discord_avatar:{user_id}'
-        
-        cached_data = await cache.get(cache_key)
+        return (await self.get_avatar_urls(cache, [user_id]))[user_id]
+
+    async def get_avatar_urls(self, cache: Redis, user_ids: Iterable[int]) -> Dict[int, str]:
+        """Avatar URLs for many users in one Redis round trip.
+
+        Cached entries are read with MGET and their TTLs refreshed in the same
+        pipeline. Outdated entries are served as they are while one background
+        refresh per user runs. Missing entries are taken from the gateway member
+        cache, and only users outside the guild are fetched from Discord.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        keys = [self._avatar_key(user_id) for user_id in user_ids]
         current_time = time.time()
 
-        if cached_data:
-            data = json.loads(cached_data)
-            last_updated = data['last_updated']
-            
-            await cache.expire(cache_key, self.AVATAR_CACHE_TTL)
-            
-            if current_time - last_updated < self.AVATAR_UPDATE_INTERVAL:
-                return data['url']
+        async with cache.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            for key in keys:
+                pipe.expire(key, self.AVATAR_CACHE_TTL)
+            cached = (await pipe.execute())[0]
 
-        try:
-            member = self.guild.get_member(user_id)
+        avatars: Dict[int, str] = {}
+        resolved: Dict[int, str] = {}
+        to_fetch: List[int] = []
+        for user_id, cached_data in zip(user_ids, cached):
+            if cached_data:
+                data = json.loads(cached_data)
+                avatars[user_id] = data['url']
+                if current_time - data['last_updated'] >= self.AVATAR_UPDATE_INTERVAL:
+                    self._refresh_avatar(cache, user_id)
+                continue
+
+            member = self.guild.get_member(user_id) if self.guild else None
             if member:
-                avatar_url = str(member.display_avatar.url)
+                resolved[user_id] = str(member.display_avatar.url)
             else:
-                user = await self.fetch_user(user_id)
-                avatar_url = str(user.avatar.url)
-
-            cache_data = json.dumps({
-                'url': avatar_url,
-                'last_updated': current_time
-            })
-            await cache.setex(cache_key, self.AVATAR_CACHE_TTL, cache_data)
-
-            return avatar_url
-        except nextcord.errors.NotFound:
-            log.warning(f"User with ID {user_id} not found")
-            return config.DISCORD_DEFAULT_PFP
+                to_fetch.append(user_id)
+
+        if resolved:
+            await self._store_avatars(cache, resolved)
+            avatars.update(resolved)
+
+        # Shielded, a client going away must not cancel a refresh others wait on
+        fetched = await asyncio.gather(*(asyncio.shield(self._refresh_avatar(cache, user_id)) for user_id in to_fetch))
+        for user_id, avatar_url in zip(to_fetch, fetched):
+            avatars[user_id] = avatar_url or config.DISCORD_DEFAULT_PFP
+        return avatars
+
+    def _refresh_avatar(self, cache: Redis, user_id: int) -> asyncio.Task:
+        """Starts, or joins, the one refresh of `user_id`'s cached avatar."""
+        task = self._avatar_refreshes.get(user_id)
+        if task is None:
+            task = self._avatar_refreshes[user_id] = asyncio.create_task(self._resolve_avatar(cache, user_id))
+            task.add_done_callback(lambda _: self._avatar_refreshes.pop(user_id, None))
+        return task
+
+    async def _resolve_avatar(self, cache: Redis, user_id: int) -> Optional[str]:
+        member = self.guild.get_member(user_id) if self.guild else None
+        if member:
+            avatar_url = str(member.display_avatar.url)
+        else:
+            if self._avatar_fetches is None:
+                self._avatar_fetches = asyncio.Semaphore(config.AVATAR_FETCH_CONCURRENCY)
+            async with self._avatar_fetches:
+                try:
+                    user = await self.fetch_user(user_id)
+                    avatar_url = str(user.avatar.url)
+                except nextcord.errors.NotFound:
+                    log.warning("User with ID %s not found", user_id)
+                    return None
+                except Exception as e:
+                    log.error("Error fetching avatar for user %s: %s", user_id, e)
+                    return None
+
+        await self._store_avatars(cache, {user_id: avatar_url})
+        return avatar_url
+
+    async def _store_avatars(self, cache: Redis, avatars: Dict[int, str]):
+        current_time = time.time()
+        try:
+            async with cache.pipeline(transaction=False) as pipe:
+                for user_id, avatar_url in avatars.items():
+                    pipe.setex(self._avatar_key(user_id), self.AVATAR_CACHE_TTL, json.dumps({
+                        'url': avatar_url,
+                        'last_updated': current_time
+                    }))
+                await pipe.execute()
         except Exception as e:
-            log.error(f"Error fetching avatar for user {user_id}: {e}")
-            return config.DISCORD_DEFAULT_PFP
+            log.error("Error caching avatars for %s users: %s", len(avatars), e)
+
+    def _store_avatar_in_background(self, user: nextcord.abc.User):
+        # Keeps the cache warm from gateway events instead of waiting for it to age out
+        if self.avatar_cache is None:
+            return
+        task = asyncio.create_task(self._store_avatars(self.avatar_cache, {user.id: str(user.display_avatar.url)}))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
 
 
 client = DiscordClient(
@@ -76,4 +196,15 @@ async def init_discord():
     client.loop.create_task(client.connect())
 
 def get_client():
-    return client
\ No newline at end of file
+    return client
+
+async def get_member_names() -> Dict[int, str]:
+    """Discord user id -> nick or username, from the gateway cache once it is ready."""
+    if client.is_ready() and client.guild:
+        return client.member_names
+    
+    members = await get_all_guild_members(config.DISCORD_GUILD_ID)
+    return {
+        int(member['user']['id']): member['nick'] or member['user']['username']
+        for member in members
+    }
\ No newline at end of file
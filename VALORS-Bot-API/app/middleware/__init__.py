@@ -1,4 +1,6 @@
 from .cors import add_cors_middleware
 from .exception_handler import add_exception_handler
-from .db_session import AsyncDBSessionMiddleware
-from .verification import SessionTokenMiddleware, AuthorizationTokenMiddleware
\ No newline at end of file
+from .db_session import LazySession
+from .pipeline import RequestPipelineMiddleware, RouteTable
+from .metrics import MetricsMiddleware
+from .upload_limit import UploadLimitMiddleware
\ No newline at end of file
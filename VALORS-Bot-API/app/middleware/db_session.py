@@ -1,16 +1,34 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
-
-class AsyncDBSessionMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        async with request.app.state.AsyncSessionLocal() as session:
-            request.state.db = session
-            try:
-                response = await call_next(request)
-                await session.commit()
-                return response
-            except Exception as e:
-                await session.rollback()
-                raise e
-            finally:
-                await session.close()
\ No newline at end of file
+from typing import Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class LazySession:
+    """Stands in for an AsyncSession and only creates it on first use.
+
+    Requests that never touch Postgres never build a session, and commit,
+    rollback and close are no-ops for them.
+    """
+    def __init__(self, factory: Callable[[], AsyncSession]):
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    async def commit(self):
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self):
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
\ No newline at end of file
@@ -1,7 +1,7 @@
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from ..utils.encoding import FastJSONResponse
 
 def add_exception_handler(app):
     @app.exception_handler(HTTPException)
     async def http_exception_handler(request: Request, exc: HTTPException):
-        return JSONResponse(status_code=exc.status_code, content=exc.detail)
\ No newline at end of file
+        return FastJSONResponse(status_code=exc.status_code, content=exc.detail)
\ No newline at end of file
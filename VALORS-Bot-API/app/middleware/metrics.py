@@ -0,0 +1,60 @@
+import time
+
+from starlette.routing import Match
+from ..utils.metrics import metrics
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and records it under its route template.
+
+    Added last so it wraps the whole stack, requests rejected by the pipeline
+    are recorded too, under the route they were meant for. Paths that match no
+    route share one label to keep the series bounded.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.finish_request(
+                token,
+                scope['method'],
+                route_template(scope),
+                status,
+                time.perf_counter() - start)
+
+
+def route_template(scope) -> str:
+    route = scope.get('route')
+    if route is None:
+        # Never reached the router, e.g. rejected by the pipeline's auth checks
+        route = _match_route(scope)
+    return getattr(route, 'path', 'unmatched')
+
+
+def _match_route(scope):
+    router = getattr(scope.get('app'), 'router', None)
+    wrong_method = None
+    for route in getattr(router, 'routes', ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+        if match == Match.PARTIAL and wrong_method is None:
+            wrong_method = route
+    return wrong_method
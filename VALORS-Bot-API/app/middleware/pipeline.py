@@ -0,0 +1,133 @@
+import hmac
+from typing import Iterable, Optional, Tuple
+
+from config import config
+from ..utils.encoding import FastJSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from .db_session import LazySession
+from ..services.login_session_manager import SessionManager
+from ..utils.database import get_user_roles
+from ..utils.session_cache import session_cache
+from ..utils import query_stats
+
+
+class RouteTable:
+    """Decides which checks a path needs using plain prefix tables.
+
+    `session_id_prefixes` only match when the prefix is directly followed by a
+    digit, e.g. "/user/" covers "/user/123/roles" but not "/user/avatars".
+    """
+    def __init__(
+        self,
+        api_token_prefixes: Iterable[str],
+        session_prefixes: Iterable[str],
+        session_id_prefixes: Iterable[str] = ()
+    ):
+        self.api_token_prefixes = tuple(api_token_prefixes)
+        self.session_prefixes = tuple(session_prefixes)
+        self.session_id_prefixes = tuple(session_id_prefixes)
+
+    def classify(self, path: str) -> Tuple[bool, bool]:
+        needs_token = path.startswith(self.api_token_prefixes)
+        needs_session = path.startswith(self.session_prefixes) or any(
+            path[len(prefix):len(prefix) + 1].isdigit()
+            for prefix in self.session_id_prefixes if path.startswith(prefix))
+        return needs_token, needs_session
+
+
+class RequestPipelineMiddleware:
+    """Single ASGI pass doing API-token auth, session auth and DB-session scoping.
+
+    `request.state.db` is a LazySession shared between the session check and the
+    route handler, so requests that never query Postgres never take a pool slot.
+    It is committed right before the response starts and rolled back if the
+    handler raises. Read-only methods get a session in autocommit mode instead,
+    so they never open a transaction and cost no BEGIN, COMMIT or ROLLBACK round
+    trips; a GET handler that writes has each statement committed on its own.
+
+    The statements a request runs are tracked from here as well; with
+    DB_QUERY_HEADER set, or in debug mode, they are summarized in X-DB-Queries.
+    """
+    READ_ONLY_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+    def __init__(self, app, routes: RouteTable):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        needs_token, needs_session = self.routes.classify(scope['path'])
+        headers = Headers(scope=scope)
+
+        if needs_token:
+            error = self._check_api_token(headers)
+            if error:
+                await error(scope, receive, send)
+                return
+
+        read_only = scope['method'] in self.READ_ONLY_METHODS
+        app_state = scope['app'].state
+        session = LazySession(app_state.ReadOnlySessionLocal if read_only else app_state.AsyncSessionLocal)
+        state = scope.setdefault('state', {})
+        state['db'] = session
+        query_header = config.DB_QUERY_HEADER or scope['app'].debug
+        stats_token = query_stats.start()
+        try:
+            if needs_session:
+                error = await self._check_session(session, headers, state)
+                if error:
+                    await error(scope, receive, send)
+                    return
+
+            response_started = False
+
+            async def send_wrapper(message):
+                nonlocal response_started
+                if message['type'] == 'http.response.start' and not response_started:
+                    response_started = True
+                    if not read_only:
+                        await session.commit()
+                    if query_header:
+                        MutableHeaders(scope=message).append('X-DB-Queries', query_stats.current().header())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception:
+                await session.rollback()
+                raise
+        finally:
+            await session.close()
+            route = scope.get('route')
+            query_stats.finish(stats_token, scope['method'], getattr(route, 'path', scope['path']))
+
+    @staticmethod
+    def _check_api_token(headers: Headers) -> Optional[FastJSONResponse]:
+        auth_header = headers.get('Authorization')
+        if not auth_header:
+            return FastJSONResponse(status_code=401, content={"error": "Missing Authorization header"})
+        if not hmac.compare_digest(auth_header, config.API_TOKEN):
+            return FastJSONResponse(status_code=401, content={"error": "Invalid Authorization token"})
+        return None
+
+    @staticmethod
+    async def _check_session(session: LazySession, headers: Headers, state: dict) -> Optional[FastJSONResponse]:
+        token = headers.get('session-token')
+        if not token:
+            return FastJSONResponse(status_code=401, content={"error": "Missing User Session token"})
+
+        principal = await session_cache.get(token)
+        if principal is None:
+            generation = session_cache.generation
+            user_session = await SessionManager.fetch(session, token)
+            if not user_session:
+                return FastJSONResponse(status_code=401, content={"error": "Invalid User Session token"})
+            principal = (user_session.user_id, await get_user_roles(session, user_session.user_id))
+            await session_cache.set(token, *principal, generation=generation)
+
+        state['user_id'], roles = principal
+        state['roles'] = list(roles)
+        return None
@@ -0,0 +1,47 @@
+from typing import Iterable
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from ..utils.encoding import FastJSONResponse
+
+# Room for the other form fields and the multipart framing around the file
+FORM_OVERHEAD = 64 * 1024
+
+
+class UploadLimitMiddleware:
+    """Rejects request bodies past the upload cap before anything spools them.
+
+    Starlette parses the whole multipart body before the route runs, so the cap
+    stage_upload enforces only protects the upload directory. Here a declared
+    Content-Length over the cap is answered with a 413 straight away, and a body
+    without one is cut off with a 413 as soon as it goes over.
+    """
+    def __init__(self, app, paths: Iterable[str], max_bytes: int):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_bytes = max_bytes + FORM_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body is larger than {self.max_bytes} bytes"
+        content_length = Headers(scope=scope).get('content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await FastJSONResponse(status_code=413, content=detail)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > self.max_bytes:
+                    # FastAPI passes an HTTPException raised while reading the body through
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -19,6 +19,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
 from enum import Enum
+from ..utils.db_pool import InstrumentedAsyncPool
 
 Base = declarative_base()
 metadata = MetaData()
@@ -116,7 +117,10 @@ class Roles(Enum):
 
 class Users(Base):
     __tablename__ = 'users'
-    __table_args__ = {'schema': 'valors_league'}
+    __table_args__ = (
+        Index('ix_users_username_trgm', 'username', postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'}),
+        {'schema': 'valors_league'}
+    )
 
     id = Column(Integer, primary_key=True)
     discord_id = Column(String, unique=True, nullable=False)
@@ -138,7 +142,10 @@ class UserRoles(Base):
 
 class Teams(Base):
     __tablename__ = "teams"
-    __table_args__ = {"schema": "valors_league"}
+    __table_args__ = (
+        Index('ix_teams_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        {"schema": "valors_league"}
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -210,15 +217,40 @@ class Sessions(Base):
 
     user = relationship("Users", back_populates="sessions")
 
-async def init_db(app, database_url):
-    engine = create_async_engine(database_url)
+async def init_db(
+    app, 
+    database_url, 
+    pool_size=5, 
+    max_overflow=10, 
+    pool_timeout=30, 
+    pool_recycle=-1, 
+    pool_pre_ping=False
+):
+    engine = create_async_engine(
+        database_url,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping)
     app.state.engine = engine
     AsyncSessionLocal = sessionmaker(
         engine, class_=AsyncSession, expire_on_commit=False)
     app.state.AsyncSessionLocal = AsyncSessionLocal
+    # Read-only requests run without a transaction: no BEGIN, COMMIT or ROLLBACK round trips
+    app.state.ReadOnlySessionLocal = sessionmaker(
+        engine.execution_options(isolation_level="AUTOCOMMIT"), class_=AsyncSession, expire_on_commit=False)
     await init_models(engine)
 
 async def init_models(engine):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.reflect)
-        await conn.run_sync(Base.metadata.create_all, tables=[table for table in Base.metadata.tables.values() if table.schema == 'valors_league'])
\ No newline at end of file
+        # Trigram indexes back the username and team name searches
+        await conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        tables = [table for table in Base.metadata.tables.values() if table.schema == 'valors_league']
+        await conn.run_sync(Base.metadata.create_all, tables=tables)
+        # create_all skips indexes of tables that already exist
+        for table in tables:
+            for index in table.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
\ No newline at end of file
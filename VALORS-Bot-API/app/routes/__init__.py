@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Request
+from fastapi.responses import Response
 from ..utils.database import get_db
+from ..utils.metrics import metrics
 from ..services import auth_service, update_service, data_service
 from .auth import router as auth_router
 from .match_making import router as mm_router
 from .discord import router as guild_router
 from .users import router as user_router
 from .teams import router as teams_router
+from .internal import router as internal_router
 
 router = APIRouter()
 
@@ -15,11 +18,20 @@ def init_routes(app):
     router.include_router(teams_router, prefix="/team", tags=["team"])
     router.include_router(guild_router, prefix="/guild", tags=["discord"])
     router.include_router(mm_router, prefix="/matchmaking", tags=["matchmaking"])
+    router.include_router(internal_router, prefix="/internal", tags=["internal"])
 
     @router.post('/update')
     async def update(request: Request):
         return await update_service.handle_update(request)
 
+    @router.get('/update/{job_id}')
+    async def update_status(request: Request, job_id: str):
+        return await update_service.handle_update_status(request, job_id)
+
+    @router.get('/metrics')
+    async def metrics_endpoint(request: Request):
+        return Response(content=await metrics.render(), media_type='text/plain; version=0.0.4')
+
     @router.get('/mm-auth/{platform}/{token}')
     async def auth(platform: str, token: str, request: Request):
         return await auth_service.handle_auth(request, platform, token)
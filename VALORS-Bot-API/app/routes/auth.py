@@ -1,6 +1,6 @@
 import hmac
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
+from ..utils.encoding import FastJSONResponse
 from config import config
 from ..services.login_session_manager import SessionManager
 from ..utils.database import get_db
@@ -14,4 +14,4 @@ async def create_session(request: Request):
 
 @router.get("/check")
 async def check_session(request: Request):
-    return JSONResponse(status_code=200, content={"success": "Logged In"})
\ No newline at end of file
+    return FastJSONResponse(status_code=200, content={"success": "Logged In"})
\ No newline at end of file
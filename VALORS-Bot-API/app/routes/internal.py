@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Request
+from ..utils.encoding import FastJSONResponse
+from ..utils.session_cache import session_cache
+from ..utils.db_pool import pool_stats
+
+router = APIRouter()
+
+@router.get("/session-cache")
+async def session_cache_stats(request: Request):
+    return FastJSONResponse(status_code=200, content=session_cache.stats())
+
+
+@router.get("/db-pool")
+async def db_pool_stats(request: Request):
+    return FastJSONResponse(status_code=200, content=pool_stats(request.app.state.engine))
\ No newline at end of file
@@ -1,36 +1,71 @@
-from typing import Dict, List
-import asyncio
-from config import config
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, HTTPException, Query, Path
+from ..utils.encoding import FastJSONResponse
 
-from ..utils.database import get_match_making_leaderboard
-from ..utils.discord import get_all_guild_members
+from ..discord import get_client, get_member_names
+from ..services.leaderboard import leaderboard_snapshot
+from ..services.ranks import rank_index
+from ..utils.streaming import ndjson_response, wants_stream
 
 router = APIRouter()
 
-async def create_member_lookup(members: List[Dict]) -> Dict[str, str]:
-    return {
-        member['user']['id']: member['nick'] or member['user']['username']
-        for member in members
-    }
+def with_username(entry: Dict[str, Any], member_names: Dict[int, str], ranks: Dict[int, Any]) -> Dict[str, Any]:
+    user_data = dict(entry)
+    user_id = user_data.pop('user_id', None)
+    user_data['mm_rank'] = ranks.get(rank_index.rank_for_mmr(user_data['mmr']))
+    # Sets 'username' at front of the dict
+    return {'username': member_names.get(user_id, f"({user_id})"), **user_data}
 
 @router.get("/leaderboard")
-async def leaderboard(request: Request):
-    members, leaderboard = await asyncio.gather(
-        get_all_guild_members(config.DISCORD_GUILD_ID),
-        get_match_making_leaderboard(request.state.db, config.DISCORD_GUILD_ID))
-    member_lookup = await create_member_lookup(members)
+async def leaderboard(
+    request: Request,
+    offset: Optional[int] = Query(None, ge=0, description="Rank offset of the first entry"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Number of entries to return. Without offset and limit the whole leaderboard is returned as a bare list, with either it is paged")
+):
+    await leaderboard_snapshot.ensure_fresh(request.state.db)
+    await rank_index.ensure_fresh(request.state.db)
+    entries = leaderboard_snapshot.page(offset or 0, limit)
+    member_names = await get_member_names() if entries else {}
+    ranks = rank_index.describe(get_client().guild)
     
-    updated_leaderboard = []
-    for entry in leaderboard:
-        user_id = entry.pop('user_id', None)
-        user_data = {}
-        if user_id:
-            username = member_lookup.get(f'{user_id}', f"({user_id})")
-        # Sets 'username' at front of the dict
-        user_data['username'] = username
-        user_data.update(entry)
-        updated_leaderboard.append(user_data)
+    if wants_stream(request):
+        return ndjson_response(
+            (with_username(entry, member_names, ranks) for entry in entries),
+            headers={
+                'X-Total-Count': str(leaderboard_snapshot.total),
+                'X-Leaderboard-Version': str(leaderboard_snapshot.version)})
     
-    return updated_leaderboard
\ No newline at end of file
+    updated_leaderboard = [with_username(entry, member_names, ranks) for entry in entries]
+    
+    # Callers from before paging get the full list in its old shape
+    if offset is None and limit is None:
+        return FastJSONResponse(status_code=200, content=updated_leaderboard)
+    
+    return FastJSONResponse(
+        status_code=200,
+        content={
+            'leaderboard': updated_leaderboard,
+            'total': leaderboard_snapshot.total,
+            'offset': offset or 0,
+            'version': leaderboard_snapshot.version,
+        })
+
+@router.get("/leaderboard/{user_id}")
+async def leaderboard_entry(
+    request: Request,
+    user_id: int = Path(..., description="Discord user ID")
+):
+    await leaderboard_snapshot.ensure_fresh(request.state.db)
+    await rank_index.ensure_fresh(request.state.db)
+    entry = leaderboard_snapshot.get(user_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail={"error": "User is not ranked"})
+    
+    return FastJSONResponse(
+        status_code=200,
+        content={
+            'entry': with_username(entry, await get_member_names(), rank_index.describe(get_client().guild)),
+            'total': leaderboard_snapshot.total,
+            'version': leaderboard_snapshot.version,
+        })
\ No newline at end of file
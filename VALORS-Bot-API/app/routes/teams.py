@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Request, HTTPException, Query, Path, Body, File, UploadFile
-from fastapi.responses import JSONResponse
+from ..utils.encoding import FastJSONResponse
+from ..utils.images import logo_variant_urls
+from ..utils.uploads import UploadTooLarge
 from typing import Optional, List
 from ..utils.database import (
     get_team,
     update_team,
-    fetch_teams,
-    total_team_count,
+    get_teams_page,
+    search_teams,
     Roles,
     join_request,
     get_team_join_requests,
@@ -16,12 +18,11 @@ from ..utils.database import (
     get_user_from_session,
     remove_team_member,
     get_team_members,
-    get_active_teams,
     create_team,
-    total_team_count,
     disband_team
 )
 from ..utils.utils import verify_permissions
+from ..utils.query_stats import query_budget
 
 router = APIRouter()
 
@@ -37,11 +38,12 @@ async def team_info(request: Request, team_id: int = Query(alias="id")):
             "color1": team.color1,
             "color2": team.color2,
             "logo_url": team.logo_url,
+            "logo_variants": logo_variant_urls(team.logo_url),
             "display_trophy": team.display_trophy,
-            "timestamp": team.timestamp.isoformat(),
+            "timestamp": team.timestamp,
             "disbanded_at": team.disbanded_at
         })
-    return JSONResponse(status_code=200, content={'team': response_data})
+    return FastJSONResponse(status_code=200, content={'team': response_data})
 
 @router.put("/update")
 async def update_info(
@@ -53,9 +55,13 @@ async def update_info(
     try:
         updated_team = await update_team(request.state.db, team_id, team_data, logo_file)
         if updated_team:
-            return JSONResponse(status_code=200, content={'message': 'Team updated successfully', 'team': updated_team})
+            return FastJSONResponse(status_code=200, content={'message': 'Team updated successfully', 'team': updated_team})
         else:
             raise HTTPException(status_code=404, detail="Team not found")
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to update team: {str(e)}")
 
@@ -69,31 +75,32 @@ async def all_teams(
     if last_team_name in ('null', 'undefined', ''):
         last_team_name = None
     
-    teams = await fetch_teams(
+    page = await get_teams_page(
         request.state.db,
         search=search,
         last_team_name=last_team_name,
         limit=limit
     )
     
-    total_teams = await total_team_count(request.state.db)
-    filtered_teams_total = await total_team_count(request.state.db, search=search)
+    total_teams = page.total
+    filtered_teams_total = page.filtered_total
     
     team_list = [{
-        "id": team.id,
-        "name": team.name,
-        "bio": team.bio,
-        "color1": team.color1,
-        "color2": team.color2,
-        "logo_url": team.logo_url,
-        "display_trophy": team.display_trophy,
-        "timestamp": team.timestamp.isoformat(),
-        "disbanded_at": team.disbanded_at
-    } for team in teams]
+        "id": team['id'],
+        "name": team['name'],
+        "bio": team['bio'],
+        "color1": team['color1'],
+        "color2": team['color2'],
+        "logo_url": team['logo_url'],
+        "logo_variants": logo_variant_urls(team['logo_url']),
+        "display_trophy": team['display_trophy'],
+        "timestamp": team['timestamp'],
+        "disbanded_at": team['disbanded_at']
+    } for team in page.rows]
         
     last_team_name = team_list[-1]['name'] if team_list else None
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=200,
         content={
             'teams': team_list,
@@ -102,6 +109,25 @@ async def all_teams(
             'last_team_name': last_team_name,
         })
 
+@router.get("/search")
+async def find_teams(
+    request: Request,
+    search: str = Query(..., alias="q", min_length=1, description="Search string for team name"),
+    limit: int = Query(20, description="Number of results to return", ge=1, le=100)
+):
+    teams = await search_teams(request.state.db, search, limit=limit)
+    return FastJSONResponse(
+        status_code=200,
+        content={
+            'teams': [{
+                'id': team.id,
+                'name': team.name,
+                'logo_url': team.logo_url,
+                'logo_variants': logo_variant_urls(team.logo_url),
+                'timestamp': team.timestamp
+            } for team in teams]
+        })
+
 @router.get("/{team_id}/members")
 async def get_members(
     request: Request,
@@ -111,7 +137,7 @@ async def get_members(
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     members = await get_team_members(request.state.db, team_id)
-    return JSONResponse(status_code=200, content={'members': members})
+    return FastJSONResponse(status_code=200, content={'members': members})
 
 @router.post("/join-request")
 async def create_join_request(
@@ -122,7 +148,7 @@ async def create_join_request(
         raise HTTPException(status_code=403, detail="You cannot request as long as you are in a team")
     
     request = await join_request(request.state.db, team_id, request.state.user_id)
-    return JSONResponse(status_code=200, content={'message': 'Join request created successfully', 'request_id': request.id})
+    return FastJSONResponse(status_code=200, content={'message': 'Join request created successfully', 'request_id': request.id})
 
 @router.get("/{team_id}/join-requests")
 async def list_join_requests(
@@ -135,9 +161,10 @@ async def list_join_requests(
         raise HTTPException(status_code=403, detail="You must be a team captain or co-captain to view join requests")
     
     join_requests = await get_team_join_requests(request.state.db, team_id)
-    return JSONResponse(status_code=200, content={'join_requests': [{'id': jr.id, 'user_id': jr.user_id, 'timestamp': jr.timestamp.isoformat()} for jr in join_requests]})
+    return FastJSONResponse(status_code=200, content={'join_requests': [{'id': jr.id, 'user_id': jr.user_id, 'timestamp': jr.timestamp} for jr in join_requests]})
 
 @router.post("/join-request/{request_id}/process")
+@query_budget(7)
 async def process_join(
     request: Request,
     request_id: int = Path(..., description="ID of the join request"),
@@ -152,7 +179,7 @@ async def process_join(
         raise HTTPException(status_code=403, detail="You must be a team captain to process join requests")
     
     action = "accepted" if accept else "declined"
-    return JSONResponse(status_code=200, content={'message': f'Join request {action} successfully'})
+    return FastJSONResponse(status_code=200, content={'message': f'Join request {action} successfully'})
 
 @router.post("/{team_id}/kick/{user_id}")
 async def kick_user(
@@ -173,11 +200,12 @@ async def kick_user(
     success = await remove_team_member(request.state.db, team_id, user_id)
     
     if success:
-        return JSONResponse(status_code=200, content={'message': 'User successfully kicked from the team'})
+        return FastJSONResponse(status_code=200, content={'message': 'User successfully kicked from the team'})
     else:
         raise HTTPException(status_code=404, detail="User not found in the team or already left")
 
 @router.post("/create")
+@query_budget(6)
 async def create_new(
     request: Request,
     team_data: dict = Body(..., description="Team data including name, bio, colors, etc.")
@@ -191,10 +219,10 @@ async def create_new(
         raise HTTPException(status_code=401, detail="A team must have a name")
 
     new_team = await create_team(request.state.db, team_data, request.state.user_id)
-    return JSONResponse(status_code=201, content={'team': {
+    return FastJSONResponse(status_code=201, content={'team': {
         'id': new_team.id,
         'name': new_team.name,
-        'timestamp': new_team.timestamp.isoformat()
+        'timestamp': new_team.timestamp
     }})
 
 @router.delete("/{team_id}")
@@ -208,7 +236,7 @@ async def disband_existing_team(
         raise HTTPException(status_code=403, detail="Only team captains can disband a team")
     
     if await disband_team(request.state.db, team_id):
-        return JSONResponse(status_code=200, content={'message': 'Team successfully disbanded'})
+        return FastJSONResponse(status_code=200, content={'message': 'Team successfully disbanded'})
     else:
         raise HTTPException(status_code=404, detail="Team not found or already disbanded")
 
@@ -224,25 +252,27 @@ async def list_active_teams(
     if last_team_name in ('null', 'undefined', ''):
         last_team_name = None
     
-    teams = await get_active_teams(
+    page = await get_teams_page(
         request.state.db,
         search=search,
         last_team_name=last_team_name,
-        limit=limit)
+        limit=limit,
+        active_only=True)
     
-    total_teams = await total_team_count(request.state.db)
-    filtered_teams_total = await total_team_count(request.state.db, search=search)
+    total_teams = page.total
+    filtered_teams_total = page.filtered_total
     
     teams_data = [{
-        'id': team.id,
-        'name': team.name,
-        'logo_url': team.logo_url,
-        'timestamp': team.timestamp.isoformat()
-    } for team in teams]
+        'id': team['id'],
+        'name': team['name'],
+        'logo_url': team['logo_url'],
+        'logo_variants': logo_variant_urls(team['logo_url']),
+        'timestamp': team['timestamp']
+    } for team in page.rows]
         
-    last_team_name = teams[-1].name if teams else None
+    last_team_name = teams_data[-1]['name'] if teams_data else None
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=200,
         content={
             'teams': teams_data,
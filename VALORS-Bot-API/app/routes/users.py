@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Request, HTTPException, Query, Path
-from fastapi.responses import JSONResponse
-from typing import Optional
+from ..utils.encoding import FastJSONResponse
+from typing import Any, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..discord import get_client
 from ..utils.database import (
     get_user_roles, 
@@ -10,16 +11,20 @@ from ..utils.database import (
     add_user_role, 
     remove_user_role,
     Roles,
-    get_users,
-    total_user_count,
+    get_users_page,
+    stream_users,
+    search_users,
     get_user_team,
 )
 from ..services.login_session_manager import SessionManager
 from ..utils.utils import verify_permissions
+from ..utils.query_stats import query_budget
+from ..utils.streaming import ndjson_response, wants_stream
 
 router = APIRouter()
 
 @router.get("/")
+@query_budget(6)
 async def user_info(
     request: Request,
     discord_user_id: int = Query(alias="id"),
@@ -59,7 +64,24 @@ async def user_info(
                 "is_active": user.is_active
             })
 
-    return JSONResponse(status_code=200, content={'user': response_data})
+    return FastJSONResponse(status_code=200, content={'user': response_data})
+
+@router.get("/avatars")
+async def user_avatars(
+    request: Request,
+    ids: str = Query(..., description="Comma separated Discord user IDs")
+):
+    try:
+        discord_user_ids = [int(user_id) for user_id in ids.split(',') if user_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma separated Discord user IDs")
+    if not discord_user_ids or len(discord_user_ids) > 100:
+        raise HTTPException(status_code=400, detail="Between 1 and 100 ids are required")
+
+    avatars = await get_client().get_avatar_urls(request.app.redis_db, discord_user_ids)
+    return FastJSONResponse(
+        status_code=200,
+        content={'avatars': {str(user_id): avatar for user_id, avatar in avatars.items()}})
 
 @router.get("/me")
 async def user_info(
@@ -84,47 +106,76 @@ async def user_info(
             "email": user.email, 
             "roles": [role.value for role in await get_user_roles(request.state.db, user.id)],
             "is_active": user.is_active})
-    return JSONResponse(status_code=200, content={'user': response_data})
+    return FastJSONResponse(status_code=200, content={'user': response_data})
+
+async def user_by_discord_id(db: AsyncSession, search: Optional[str]) -> List[Dict[str, Any]]:
+    """The user whose Discord id is `search`, for searches matching no username."""
+    # Discord ids are numeric, nothing else can match the id fallback
+    if not search or not search.isdigit():
+        return []
+    user = await get_user_from_discord(db, search)
+    if not user:
+        return []
+    users_roles = await get_users_roles(db, [user.id])
+    return [{
+        "id": user.id,
+        "discord_id": user.discord_id,
+        "username": user.username,
+        "roles": users_roles.get(user.id, None)
+    }]
 
 @router.get("/all")
 async def all_users(
     request: Request,
     search: str = Query(None, description="Search string for username"),
     last_username: Optional[str] = Query(None, description="Last username for pagination"),
-    limit: int = Query(20, description="Number of results to return", ge=1, le=100)
+    limit: Optional[int] = Query(None, description="Number of results to return, 20 by default. Streamed responses are unbounded without it", ge=1, le=100)
 ):
     verify_permissions(request, Roles.ADMIN)
 
     if last_username in ('null', 'undefined', ''):
         last_username = None
     
-    users = await get_users(
+    if wants_stream(request):
+        # The stream has no envelope, totals go in headers. A one-row page gives
+        # them and tells whether the id fallback applies before streaming starts.
+        head = await get_users_page(
+            request.state.db,
+            search=search,
+            last_username=last_username,
+            limit=1)
+        filtered_users_total = head.filtered_total
+        if head.rows:
+            records = stream_users(
+                request.state.db,
+                search=search,
+                last_username=last_username,
+                limit=limit)
+        else:
+            records = await user_by_discord_id(request.state.db, search)
+            if records:
+                filtered_users_total = 1
+        return ndjson_response(records, headers={
+            'X-Total-Count': str(head.total),
+            'X-Filtered-Count': str(filtered_users_total)})
+    
+    page = await get_users_page(
         request.state.db,
         search=search,
         last_username=last_username,
-        limit=limit)
-    
-    total_users = await total_user_count(request.state.db)
-    filtered_users_total = await total_user_count(request.state.db, search=search)
+        limit=limit or 20)
+    users = page.rows
+    total_users = page.total
+    filtered_users_total = page.filtered_total
     
     if len(users) == 0:
-        user = await get_user_from_discord(request.state.db, search)
-        if user:
-            users.append({
-                "id": user.id,
-                "discord_id": user.discord_id,
-                "username": user.username
-            })
+        users = await user_by_discord_id(request.state.db, search)
+        if users:
             filtered_users_total = 1
-    
-    users_roles = await get_users_roles(request.state.db, [u['id'] for u in users])
-    for user in users:
-        user.pop('email')
-        user.update({ 'roles': users_roles.get(user['id'], None) })
         
     last_username = users[-1]['username'] if users else None
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=200,
         content={
             'users': users,
@@ -133,10 +184,21 @@ async def all_users(
             'last_username': last_username,
         })
 
+@router.get("/search")
+async def find_users(
+    request: Request,
+    search: str = Query(..., alias="q", min_length=1, description="Search string for username"),
+    limit: int = Query(20, description="Number of results to return", ge=1, le=100)
+):
+    verify_permissions(request, Roles.ADMIN)
+
+    users = await search_users(request.state.db, search, limit=limit)
+    return FastJSONResponse(status_code=200, content={'users': users})
+
 @router.get("/roles")
 async def get_roles(request: Request):
     roles = list(sorted({role.value for role in Roles}))
-    return JSONResponse(status_code=200, content={ 'roles': roles })
+    return FastJSONResponse(status_code=200, content={ 'roles': roles })
 
 @router.post("/{discord_user_id}/roles/{role}")
 async def add_role(
@@ -152,7 +214,7 @@ async def add_role(
     try:
         if not await add_user_role(request.state.db, user.id, role):
             raise Exception("User already has role")
-        return JSONResponse(status_code=200, content={"message": f"Role {role.value} added to user {user.id}"})
+        return FastJSONResponse(status_code=200, content={"message": f"Role {role.value} added to user {user.id}"})
     except Exception as e:
         raise HTTPException(status_code=400, detail={"error": f"Failed to add role: {str(e)}"})
 
@@ -170,6 +232,6 @@ async def remove_role(
     try:
         if not await remove_user_role(request.state.db, user.id, role):
             raise Exception("User does not have role")
-        return JSONResponse(status_code=200, content={"message": f"Role {role.value} removed from user {user.id}"})
+        return FastJSONResponse(status_code=200, content={"message": f"Role {role.value} removed from user {user.id}"})
     except Exception as e:
         raise HTTPException(status_code=400, detail={"error": f"Failed to remove role: {str(e)}"})
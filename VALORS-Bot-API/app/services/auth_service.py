@@ -13,17 +13,17 @@ templates = Jinja2Templates(directory="pages")
 
 async def handle_auth(request: Request, platform: str, token: str):
     if platform not in Platform._value2member_map_:
-        log.info(f"platform {platform} is invalid")
+        log.info("platform %s is invalid", platform)
         raise HTTPException(status_code=400, detail={"error": "Invalid platform"})
 
     token_data = await request.app.redis_db.hgetall(token)
     if not token_data:
-        log.info(f"token_data {token_data} is invalid")
+        log.info("token_data %s is invalid", token_data)
         raise HTTPException(status_code=400, detail={"error": "Invalid token", "message": "Your link is invalid or has expired. Generate a new link and try again."})
     
     expires_at = datetime.fromisoformat(token_data['expires_at'])
     if datetime.now(timezone.utc) > expires_at:
-        log.info(f"token_data {token_data} expired")
+        log.info("token_data %s expired", token_data)
         raise HTTPException(status_code=400, detail={"error": "Token expired", "message": "Your link expired. Generate a new link and try again."})
 
     if platform == Platform.STEAM.value:
@@ -40,7 +40,7 @@ async def handle_auth(request: Request, platform: str, token: str):
             'openid.claimed_id': 'http://specs.openid.net/auth/2.0/identifier_select'
         }
         auth_url = f"{steam_openid_url}?{urlencode(params)}"
-        log.info(f"auth_url {auth_url} provided to token {token}")
+        log.info("auth_url %s provided to token %s", auth_url, token)
         return RedirectResponse(url=auth_url)
     elif platform == Platform.PLAYSTATION.value:
         raise HTTPException(status_code=501, detail={"error": 'PlayStation authentication not implemented yet'})
@@ -48,7 +48,7 @@ async def handle_auth(request: Request, platform: str, token: str):
 async def handle_verify(request: Request):
     token = request.query_params.get('token')
     if token is None:
-        log.info(f"Incorrect header token")
+        log.info("Incorrect header token")
         return RedirectResponse(url=str(request.url_for('verified').include_query_params(failed=True, error="Incorrect header")))
 
     token_data = await request.app.redis_db.hgetall(token)
@@ -62,20 +62,20 @@ async def handle_verify(request: Request):
     platform = token_data['platform']
     await request.app.redis_db.delete(token)
     
-    log.info(f"Verification discord_uuid {discord_uuid} with token {token} for {platform}")
+    log.info("Verification discord_uuid %s with token %s for %s", discord_uuid, token, platform)
     if platform == Platform.STEAM.value:
         openid_claimed_id = request.query_params.get('openid.claimed_id')
-        log.info(f"Received openid_claimed_id: {openid_claimed_id}")
+        log.info("Received openid_claimed_id: %s", openid_claimed_id)
         if not openid_claimed_id:
             log.error("openid_claimed_id is missing")
             return RedirectResponse(url=str(request.url_for('verified').include_query_params(failed=True)))
 
         steamid = openid_claimed_id.split('/')[-1]
         user_id = SteamID(steamid).as_64
-        log.info(f"Extracted steamid: {steamid}, user_id: {discord_uuid}")
+        log.info("Extracted steamid: %s, user_id: %s", steamid, discord_uuid)
     elif platform == Platform.PLAYSTATION.value:
         user_id = "playstation_id_placeholder"
-        log.info(f"Extracted user_id for PlayStation: {discord_uuid}")
+        log.info("Extracted user_id for PlayStation: %s", discord_uuid)
 
     db = request.state.db
     try:
@@ -84,13 +84,13 @@ async def handle_verify(request: Request):
         existing_mapping = await get_existing_mapping(db, user_id_str)
         if existing_mapping:
             if existing_mapping.user_id == int(discord_uuid):
-                log.info(f"User {discord_uuid} has already verified with platform ID {user_id_str}")
+                log.info("User %s has already verified with platform ID %s", discord_uuid, user_id_str)
                 return RedirectResponse(url=str(request.url_for('verified').include_query_params(already_verified=True, steam_id=user_id_str, discord_uuid=discord_uuid)))
-            log.error(f"Platform ID {user_id_str} is already associated to a Discord account.")
+            log.error("Platform ID %s is already associated to a Discord account.", user_id_str)
             return RedirectResponse(url=str(request.url_for('verified').include_query_params(failed=True, error="Platform ID already associated to a Discord account")))
         
         mapping = await get_user_platform_mapping(db, discord_uuid, Platform(platform))
-        log.info(f"Mapping from database: {mapping}")
+        log.info("Mapping from database: %s", mapping)
         
         await update_user_platform_mapping(
             db, mapping, 
@@ -104,13 +104,13 @@ async def handle_verify(request: Request):
         if settings:
             role_id = settings.mm_verified_role
             if await add_discord_role(guild_id, discord_uuid, role_id):
-                log.info(f"Verified role added to user {discord_uuid} in guild {guild_id}")
+                log.info("Verified role added to user %s in guild %s", discord_uuid, guild_id)
             else:
-                log.error(f"Failed to add verified role to user {discord_uuid} in guild {guild_id}")
+                log.error("Failed to add verified role to user %s in guild %s", discord_uuid, guild_id)
 
     except Exception as e:
         await db.rollback()
-        log.error(f"Database error: {str(e)}")
+        log.error("Database error: %s", e)
         return RedirectResponse(url=str(request.url_for('verified').include_query_params(failed=True, error=str(e))))
 
     return RedirectResponse(url=str(request.url_for('verified').include_query_params(steam_id=user_id if platform == Platform.STEAM.value else None, discord_uuid=discord_uuid)))
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import time
+from typing import Optional, Tuple
+
+from aioredis import Redis
+from config import config
+from ..utils.discord_rest import discord_rest
+from ..utils.encoding import dumps
+from ..utils.logger import log
+
+Catalogue = Tuple[str, str]
+
+
+class CommandCatalogue:
+    """Merged global and guild slash commands, cached in Redis with an ETag.
+
+    Commands only change when the bot is redeployed, so the catalogue is fetched
+    from Discord in the background and requests are answered from the cache. A
+    stale copy keeps being served while a refresh is running.
+
+    The bot registers its new commands some time after a redeploy is triggered, so
+    expect_redeploy() refreshes every `redeploy_interval` seconds for
+    `redeploy_window` seconds instead of once. The window is kept in Redis so
+    every worker follows it.
+    """
+    KEY = 'discord_commands'
+    REDEPLOY_KEY = 'discord_commands_redeploy'
+
+    def __init__(self, application_id: int, guild_id: int, refresh_interval: float,
+                 redeploy_window: float, redeploy_interval: float):
+        self.application_id = application_id
+        self.guild_id = guild_id
+        self.refresh_interval = refresh_interval
+        self.redeploy_window = redeploy_window
+        self.redeploy_interval = redeploy_interval
+        self._redeploy_until = 0.0
+        self._redis: Optional[Redis] = None
+        self._local: Optional[Catalogue] = None
+        self._fetched_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def bind(self, redis: Redis):
+        self._redis = redis
+
+    async def get(self) -> Catalogue:
+        """Returns `(etag, body)`, fetching from Discord only when nothing is cached anywhere."""
+        cached = await self._load()
+        if cached is not None:
+            catalogue, fetched_at = cached
+            if time.time() - fetched_at > self._max_age():
+                self._schedule_refresh()
+            return catalogue
+        if self._local is not None:
+            self._schedule_refresh()
+            return self._local
+        return await asyncio.shield(self._schedule_refresh())
+
+    async def invalidate(self):
+        self._fetched_at = 0.0
+        if self._redis is None:
+            self._local = None
+            return
+        try:
+            await self._redis.delete(self.KEY)
+        except Exception as e:
+            log.error("Command catalogue invalidation failed: %s", e)
+
+    async def expect_redeploy(self):
+        self._redeploy_until = time.time() + self.redeploy_window
+        if self._redis is not None:
+            try:
+                await self._redis.set(self.REDEPLOY_KEY, 1, ex=int(self.redeploy_window))
+            except Exception as e:
+                log.error("Command catalogue redeploy window failed: %s", e)
+        await self.invalidate()
+
+    def _max_age(self) -> float:
+        if time.time() < self._redeploy_until:
+            return self.redeploy_interval
+        return self.refresh_interval
+
+    async def _sync_redeploy(self):
+        # Picks up a window opened by another worker
+        if self._redis is None:
+            return
+        remaining = await self._redis.ttl(self.REDEPLOY_KEY)
+        if remaining > 0:
+            self._redeploy_until = max(self._redeploy_until, time.time() + remaining)
+
+    async def _load(self) -> Optional[Tuple[Catalogue, float]]:
+        if self._redis is None:
+            if self._local is None:
+                return None
+            return self._local, self._fetched_at
+        try:
+            cached = await self._redis.hgetall(self.KEY)
+        except Exception as e:
+            log.error("Command catalogue lookup failed: %s", e)
+            return None
+        if not cached:
+            return None
+        self._local = (cached['etag'], cached['body'])
+        return self._local, float(cached['fetched_at'])
+
+    def _schedule_refresh(self) -> asyncio.Task:
+        # Concurrent misses share a single fetch
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self.refresh())
+            self._refreshing.add_done_callback(self._log_failure)
+        return self._refreshing
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Command catalogue refresh failed: %s", task.exception())
+
+    async def refresh(self) -> Catalogue:
+        global_commands, guild_commands = await asyncio.gather(
+            discord_rest.request('GET', f"/applications/{self.application_id}/commands"),
+            discord_rest.request('GET', f"/applications/{self.application_id}/guilds/{self.guild_id}/commands"))
+        for response in (global_commands, guild_commands):
+            response.raise_for_status()
+
+        body = dumps(global_commands.json() + guild_commands.json()).decode()
+        etag = f'"{hashlib.sha1(body.encode()).hexdigest()}"'
+        fetched_at = time.time()
+        self._local = (etag, body)
+        self._fetched_at = fetched_at
+        if self._redis is not None:
+            try:
+                await self._redis.hset(self.KEY, mapping={'etag': etag, 'body': body, 'fetched_at': fetched_at})
+            except Exception as e:
+                log.error("Command catalogue store failed: %s", e)
+        return self._local
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._sync_redeploy()
+                cached = await self._load()
+                # Another worker may already have refreshed the shared copy
+                if cached is None or time.time() - cached[1] > self._max_age():
+                    await asyncio.shield(self._schedule_refresh())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # Logged by the refresh task itself
+            await asyncio.sleep(self._max_age())
+
+
+command_catalogue = CommandCatalogue(
+    config.DISCORD_BOT_ID,
+    config.DISCORD_GUILD_ID,
+    config.COMMANDS_REFRESH_INTERVAL,
+    config.COMMANDS_REDEPLOY_WINDOW,
+    config.COMMANDS_REDEPLOY_REFRESH_INTERVAL)
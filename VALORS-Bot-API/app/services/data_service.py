@@ -1,6 +1,6 @@
 import random
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from ..utils.encoding import FastJSONResponse
 from ..utils.logger import log
 
 async def handle_data(request: Request):
@@ -12,6 +12,6 @@ async def handle_data(request: Request):
         "client": request.client.host,
         "user_agent": request.headers.get("User-Agent")
     }
-    log.info(f"Data request received: {request_info}")
+    log.info("Data request received: %s", request_info)
     response_data = {"number": random.randrange(100)}
-    return JSONResponse(content=response_data)
\ No newline at end of file
+    return FastJSONResponse(content=response_data)
\ No newline at end of file
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import config
+from ..utils.database import (
+    get_match_making_leaderboard,
+    get_match_making_leaderboard_fingerprint,
+    get_match_making_leaderboard_versions,
+)
+from ..utils.locks import LazyLock
+from ..utils.logger import log
+
+
+class LeaderboardSnapshot:
+    """Ranked matchmaking leaderboard kept in memory and served in pages.
+
+    A background task polls a cheap aggregate fingerprint of the guild's summary
+    stats, which moves with every write to them. When it changes, the row versions
+    tell which players changed and only those rows are re-read and merged in;
+    a rebuild reads everything. Requests fall back to refreshing inline when the
+    snapshot is older than the refresh interval, so a dead background task never
+    serves stale data forever.
+    """
+    # Past this many changed rows one full read is cheaper than the merge
+    INCREMENTAL_LIMIT = 1000
+
+    def __init__(self, guild_id: int, refresh_interval: float):
+        self.guild_id = guild_id
+        self.refresh_interval = refresh_interval
+        self.rows: List[Dict[str, Any]] = []
+        self.version = 0
+        self.refreshed_at = 0.0
+        self._positions: Dict[int, int] = {}
+        self._fingerprint: Optional[tuple] = None
+        self._row_versions: Dict[int, int] = {}
+        self._lock = LazyLock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.rows)
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.refreshed_at > self.refresh_interval
+
+    async def refresh(self, db: AsyncSession, force: bool = False) -> bool:
+        async with self._lock:
+            return await self._refresh(db, force)
+
+    async def ensure_fresh(self, db: AsyncSession):
+        if not self.is_stale():
+            return
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            if self.is_stale():
+                await self._refresh(db)
+
+    async def _refresh(self, db: AsyncSession, force: bool = False) -> bool:
+        fingerprint = await get_match_making_leaderboard_fingerprint(db, self.guild_id)
+        if not force and fingerprint == self._fingerprint:
+            self.refreshed_at = time.monotonic()
+            return False
+
+        versions = await get_match_making_leaderboard_versions(db, self.guild_id)
+        changed = [user_id for user_id, version in versions.items() if self._row_versions.get(user_id) != version]
+        if force or not self._row_versions or len(changed) > self.INCREMENTAL_LIMIT:
+            rows = await get_match_making_leaderboard(db, self.guild_id)
+        else:
+            by_user = {row['user_id']: row for row in self.rows if row['user_id'] in versions}
+            if changed:
+                for row in await get_match_making_leaderboard(db, self.guild_id, changed):
+                    by_user[row['user_id']] = row
+            # The order of the full read: mmr descending, nulls last, then user_id
+            rows = sorted(by_user.values(), key=lambda row: (row['mmr'] is None, -(row['mmr'] or 0), row['user_id']))
+
+        for position, row in enumerate(rows):
+            rank = position + 1
+            if row.get('rank') != rank:
+                # Rows are shared with the previous snapshot, which may still be serving a page
+                rows[position] = {**row, 'rank': rank}
+
+        self.rows = rows
+        self._row_versions = versions
+        self._positions = {row['user_id']: index for index, row in enumerate(rows)}
+        self._fingerprint = fingerprint
+        self.version += 1
+        self.refreshed_at = time.monotonic()
+        return True
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        end = None if limit is None else offset + limit
+        return self.rows[offset:end]
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        position = self._positions.get(user_id)
+        return None if position is None else self.rows[position]
+
+    async def start(self, session_factory):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self, session_factory):
+        while True:
+            try:
+                async with session_factory() as db:
+                    if await self.refresh(db):
+                        log.debug("Leaderboard snapshot %s built with %s players", self.version, self.total)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("Leaderboard refresh failed: %s", e)
+            await asyncio.sleep(self.refresh_interval)
+
+
+leaderboard_snapshot = LeaderboardSnapshot(config.DISCORD_GUILD_ID, config.LEADERBOARD_REFRESH_INTERVAL)
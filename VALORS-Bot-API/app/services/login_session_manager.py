@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import delete
 from app.models import Sessions, Users
+from app.utils.session_cache import session_cache
 
 class SessionManager:
     @staticmethod
@@ -33,6 +34,7 @@ class SessionManager:
     async def delete(db_session: AsyncSession, session: Sessions):
         await db_session.delete(session)
         await db_session.commit()
+        await session_cache.invalidate_token(session.session_token)
 
     @staticmethod
     async def cleanup(db_session: AsyncSession, max_age: timedelta = timedelta(days=30)):
@@ -0,0 +1,76 @@
+from typing import Dict, Iterable, List, Optional
+
+import nextcord
+from ..utils.encoding import dumps
+from ..utils.utils import resize_image_url
+from .ranks import RankIndex, describe_rank, rank_index
+
+
+def encode_member(member: nextcord.Member, ranks: RankIndex) -> bytes:
+    return dumps({
+        "id": str(member.id),
+        "username": member.name,
+        "nick": member.nick,
+        "name": member.display_name,
+        "discriminator": member.discriminator,
+        "avatar_url": resize_image_url(member.display_avatar.url, 64).replace('.png', '.webp'),
+        "status": str(member.status),
+        "roles": [role.name for role in member.roles[1:]],
+        "mm_rank": describe_rank(ranks.rank_for_roles(member.roles)),
+        "is_bot": member.bot
+    })
+
+
+class MemberSnapshot:
+    """Guild members kept as pre-encoded JSON records, in guild order.
+
+    The Discord client keeps the snapshot current from gateway member, presence
+    and role events, so /guild/members only slices and joins bytes. Records embed
+    the member's rank, so the snapshot is rebuilt when the rank index changes.
+    """
+    def __init__(self, ranks: RankIndex):
+        self.ranks = ranks
+        self.rank_version: Optional[int] = None
+        self.ready = False
+        self._records: Dict[int, bytes] = {}
+        self._ordered: Optional[List[bytes]] = None
+
+    @property
+    def total(self) -> int:
+        return len(self._records)
+
+    def is_current(self) -> bool:
+        return self.ready and self.rank_version == self.ranks.version
+
+    def rebuild(self, members: Iterable[nextcord.Member]):
+        self.rank_version = self.ranks.version
+        self._records = {member.id: encode_member(member, self.ranks) for member in members}
+        self._ordered = None
+        self.ready = True
+
+    def upsert(self, member: nextcord.Member):
+        if self.ready:
+            self._records[member.id] = encode_member(member, self.ranks)
+            self._ordered = None
+
+    def remove(self, member_id: int):
+        if self._records.pop(member_id, None) is not None:
+            self._ordered = None
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> List[bytes]:
+        if self._ordered is None:
+            self._ordered = list(self._records.values())
+        end = None if limit is None else offset + limit
+        return self._ordered[offset:end]
+
+    def render(self, offset: int = 0, limit: Optional[int] = None) -> bytes:
+        """The /guild/members response body for the given slice."""
+        return b''.join((
+            b'{"members":[',
+            b','.join(self.page(offset, limit)),
+            b'],"total_members":',
+            str(self.total).encode(),
+            b'}'))
+
+
+member_snapshot = MemberSnapshot(rank_index)
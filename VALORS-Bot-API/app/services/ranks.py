@@ -0,0 +1,87 @@
+import bisect
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import nextcord
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import config
+from ..utils.database import get_mm_ranks
+from ..utils.locks import LazyLock
+from ..utils.utils import resize_image_url
+
+
+def describe_rank(role: Optional[nextcord.Role]) -> Optional[Dict[str, Any]]:
+    if role is None:
+        return None
+    return {
+        "name": role.name,
+        "color": f'{role.color}',
+        "url": resize_image_url(role.icon.url, 24) if role.icon else None
+    }
+
+
+class RankIndex:
+    """The guild's matchmaking ranks, indexed by role id and by MMR threshold.
+
+    Ranks are written by the matchmaking bot, so the index is re-read once its
+    TTL expires and `version` only moves when the ranks actually changed.
+    """
+    def __init__(self, guild_id: int, ttl: float):
+        self.guild_id = guild_id
+        self.ttl = ttl
+        self.version = 0
+        self.loaded_at = 0.0
+        self.loaded = False
+        self._entries: List[Tuple[int, int]] = []
+        self._thresholds: List[int] = []
+        self._role_ids: List[int] = []
+        self._by_role: Dict[int, int] = {}
+        self._lock = LazyLock()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at > self.ttl
+
+    def invalidate(self):
+        self.loaded_at = 0.0
+
+    async def ensure_fresh(self, db: AsyncSession):
+        if not self.is_stale():
+            return
+        async with self._lock:
+            if self.is_stale():
+                ranks = await get_mm_ranks(db, self.guild_id)
+                self.replace((rank.mmr_threshold, rank.role_id) for rank in ranks)
+
+    def replace(self, entries: Iterable[Tuple[int, int]]):
+        """Loads `(mmr_threshold, role_id)` pairs."""
+        entries = sorted(entries)
+        self.loaded_at = time.monotonic()
+        self.loaded = True
+        if entries == self._entries:
+            return
+        self._entries = entries
+        self._thresholds = [threshold for threshold, _ in entries]
+        self._role_ids = [role_id for _, role_id in entries]
+        self._by_role = {role_id: threshold for threshold, role_id in entries}
+        self.version += 1
+
+    @property
+    def role_ids(self) -> List[int]:
+        return self._role_ids
+
+    def describe(self, guild: Optional[nextcord.Guild]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Role id -> public rank payload, for resolving many rows against few ranks."""
+        return {role_id: describe_rank(guild.get_role(role_id) if guild else None) for role_id in self._role_ids}
+
+    def rank_for_roles(self, roles: Sequence[nextcord.Role]) -> Optional[nextcord.Role]:
+        return next((role for role in roles if role.id in self._by_role), None)
+
+    def rank_for_mmr(self, mmr: Optional[int]) -> Optional[int]:
+        """Role id of the highest rank whose threshold `mmr` reaches."""
+        if mmr is None:
+            return None
+        position = bisect.bisect_right(self._thresholds, mmr)
+        return self._role_ids[position - 1] if position else None
+
+
+rank_index = RankIndex(config.DISCORD_GUILD_ID, config.RANK_INDEX_TTL)
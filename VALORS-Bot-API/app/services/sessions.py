@@ -1,6 +1,6 @@
 import hmac
 from fastapi import HTTPException, Request
-from fastapi.responses import JSONResponse
+from ..utils.encoding import FastJSONResponse
 from ..utils.discord import get_user_info
 from ..utils.logger import log
 from ..utils.database import upsert_user
@@ -36,4 +36,4 @@ class Sessions:
             raise HTTPException(status_code=500, detail={"error": "Something went wrong during user session creation"})
         
         log.info(f"Login info posted for {user_info['id']}")
-        return JSONResponse(status_code=200, content={'session_token': session.session_token})
+        return FastJSONResponse(status_code=200, content={'session_token': session.session_token})
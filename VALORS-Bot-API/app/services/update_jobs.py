@@ -0,0 +1,117 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import uuid4
+
+from aioredis import Redis
+from config import config
+from ..utils.logger import log
+from ..utils.pipe_utils import write_to_pipe
+from .commands import command_catalogue
+
+UpdateJob = Dict[str, Any]
+
+# Scripts next to execpipe.sh on the host, by update type
+SCRIPTS = {
+    'regular': 'update.sh',
+    'force': 'force_update.sh',
+}
+
+
+class UpdateJobState(Enum):
+    QUEUED = 'queued'
+    DISPATCHED = 'dispatched'
+    FAILED = 'failed'
+
+
+class UpdateJobs:
+    """Update requests handed to the host through the update FIFO.
+
+    Jobs are kept in Redis so any worker can report on them. A trigger that
+    repeats one of the same type less than `dedup_window` seconds old gets that
+    job back instead of queueing the update again, unless it failed.
+    """
+    KEY_PREFIX = 'update_job:'
+    LATEST_KEY_PREFIX = 'update_job_latest:'
+
+    def __init__(self, pipe_path: str, pipe_timeout: float, dedup_window: int, ttl: int):
+        self.pipe_path = pipe_path
+        self.pipe_timeout = pipe_timeout
+        self.dedup_window = dedup_window
+        self.ttl = ttl
+        self._redis: Optional[Redis] = None
+        self._dispatches: Set[asyncio.Task] = set()
+
+    def bind(self, redis: Redis):
+        self._redis = redis
+
+    async def submit(self, update_type: str, requested_by: str) -> Tuple[UpdateJob, bool]:
+        """Queues an update, returning the job and whether it is a new one."""
+        job = {
+            'id': uuid4().hex,
+            'type': update_type,
+            'state': UpdateJobState.QUEUED.value,
+            'requested_by': requested_by,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'dispatched_at': None,
+            'error': None,
+        }
+        # Stored before it is claimed, so a duplicate never finds the claim without the job
+        await self._save(job)
+        latest_key = f'{self.LATEST_KEY_PREFIX}{update_type}'
+        if not await self._redis.set(latest_key, job['id'], nx=True, ex=self.dedup_window):
+            latest_id = await self._redis.get(latest_key)
+            latest = await self.get(latest_id) if latest_id else None
+            if latest is not None:
+                await self._redis.delete(f'{self.KEY_PREFIX}{job["id"]}')
+                return latest, False
+            # The claim expired in between
+            await self._redis.set(latest_key, job['id'], ex=self.dedup_window)
+
+        task = asyncio.create_task(self._dispatch(job))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+        return job, True
+
+    async def get(self, job_id: str) -> Optional[UpdateJob]:
+        cached = await self._redis.get(f'{self.KEY_PREFIX}{job_id}')
+        return json.loads(cached) if cached else None
+
+    async def stop(self):
+        # Dispatches are bounded by the pipe timeout, let them record their outcome
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+
+    async def _save(self, job: UpdateJob):
+        await self._redis.setex(f'{self.KEY_PREFIX}{job["id"]}', self.ttl, json.dumps(job))
+
+    async def _dispatch(self, job: UpdateJob):
+        update_type = job['type']
+        command = f"{SCRIPTS[update_type]} {job['requested_by']}"
+        if await write_to_pipe(self.pipe_path, command, self.pipe_timeout):
+            job.update(state=UpdateJobState.DISPATCHED.value, dispatched_at=datetime.now(timezone.utc).isoformat())
+            log.info("%s UPDATE %s dispatched", update_type.upper(), job['id'])
+            # The redeploy may register new slash commands once the bot is back up
+            await command_catalogue.expect_redeploy()
+        else:
+            job.update(state=UpdateJobState.FAILED.value, error="Could not hand the update to the host")
+            log.error("%s UPDATE %s failed", update_type.upper(), job['id'])
+
+        try:
+            await self._save(job)
+            if job['state'] == UpdateJobState.FAILED.value:
+                # A failed job must not swallow the retry
+                latest_key = f'{self.LATEST_KEY_PREFIX}{update_type}'
+                if await self._redis.get(latest_key) == job['id']:
+                    await self._redis.delete(latest_key)
+        except Exception as e:
+            log.error("Recording UPDATE %s as %s failed: %s", job['id'], job['state'], e)
+
+
+update_jobs = UpdateJobs(
+    config.UPDATE_PIPE_PATH,
+    config.UPDATE_PIPE_TIMEOUT,
+    config.UPDATE_DEDUP_WINDOW,
+    config.UPDATE_JOB_TTL)
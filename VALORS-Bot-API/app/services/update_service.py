@@ -1,31 +1,48 @@
 import hmac
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
-from ..utils.pipe_utils import write_to_pipe_with_timeout
+from ..utils.encoding import FastJSONResponse
 from ..utils.logger import log
+from .update_jobs import SCRIPTS, update_jobs
 from config import config
 
-async def handle_update(request: Request):
-    update_ip = request.headers.get('x-forwarded-for', "null").split(', ')[0]
+def _authorize(request: Request, update_type: str = 'status'):
     auth_header = request.headers.get('Authorization')
     if not auth_header:
         raise HTTPException(status_code=401, detail={"error": "Missing Authorization header"})
-    
+    if not hmac.compare_digest(auth_header, config.UPDATE_API_KEY):
+        log.error("%s UPDATE authentication failed", update_type.upper())
+        raise HTTPException(status_code=401, detail={"error": f"Invalid token for {update_type} update"})
+
+async def handle_update(request: Request):
+    update_ip = request.headers.get('x-forwarded-for', "null").split(', ')[0]
+    if not request.headers.get('Authorization'):
+        raise HTTPException(status_code=401, detail={"error": "Missing Authorization header"})
+
     update_type = request.query_params.get('type', None)
-    
-    log.warning(f"Endpoint attempted by {update_ip}")
-    if update_type not in ['regular', 'force']:
-        log.error(f"/update invalid")
+
+    log.warning("Endpoint attempted by %s", update_ip)
+    if update_type not in SCRIPTS:
+        log.error("/update invalid")
         raise HTTPException(status_code=400, detail={"error": "Invalid update type"})
 
-    if not hmac.compare_digest(auth_header, config.UPDATE_API_KEY):
-        log.error(f"{update_type.upper()} UPDATE authentication failed")
-        raise HTTPException(status_code=401, detail={"error": f"Invalid token for {update_type} update"})
-    
-    script = f'update.sh {update_ip}' if update_type == 'regular' else f'force_update.sh {update_ip}'
-    if write_to_pipe_with_timeout('/hostpipe/apipipe', script):
-        log.info(f"{update_type.upper()} UPDATE called successfully")
-        return JSONResponse(content={'status': f'{update_type.capitalize()} Update initiated successfully'}, status_code=200)
-    
-    log.error(f"{update_type.upper()} UPDATE failed")
-    raise HTTPException(status_code=500, detail={"error": f"Failed to initiate {update_type} update"})
\ No newline at end of file
+    _authorize(request, update_type)
+
+    # The pipe is written in the background, the job reports how that went
+    job, created = await update_jobs.submit(update_type, update_ip)
+    if created:
+        log.info("%s UPDATE %s queued", update_type.upper(), job['id'])
+        status = f"{update_type.capitalize()} update queued"
+    else:
+        log.info("%s UPDATE repeated, already %s as %s", update_type.upper(), job['state'], job['id'])
+        status = f"{update_type.capitalize()} update already {job['state']}"
+    return FastJSONResponse(
+        status_code=202,
+        content={'status': status, 'job': job},
+        headers={'Location': f"/update/{job['id']}"})
+
+async def handle_update_status(request: Request, job_id: str):
+    _authorize(request)
+    job = await update_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail={"error": "Update job not found"})
+    return FastJSONResponse(status_code=200, content={'job': job})
@@ -1,17 +1,25 @@
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
 from fastapi import UploadFile
-import os
 from datetime import datetime
-import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
-from sqlalchemy import desc, delete, desc, update, and_, insert, exists
+from sqlalchemy import desc, delete, desc, update, and_, insert, exists, cast, Float, literal_column
 from ..models import MMBotUserSummaryStats, MMBotRanks, Users, Roles
 from config import config
+from .session_cache import session_cache
+from .list_query import ListPage, fetch_list_page, invalidate_total
+from .images import logo_variant_urls, logo_variants
+from .uploads import stage_upload
 
 from ..models import *
 
+def escape_like(search: str) -> str:
+    return search.replace('/', '//').replace('%', '/%').replace('_', '/_')
+
+def contains_pattern(search: str) -> str:
+    return f"%{escape_like(search)}%"
+
 async def get_db():
     async with AsyncSession() as session:
         try: yield session
@@ -35,6 +43,7 @@ async def upsert_user(db: AsyncSession, **user_info: dict) -> Users:
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        invalidate_total('users')
 
         await add_user_role(db, user.id, Roles.USER)
 
@@ -48,7 +57,7 @@ async def get_user(db: AsyncSession, user_id: int):
 async def total_user_count(db: AsyncSession, search: Optional[str]=None) -> int:
     query = select(func.count(Users.id))
     if search:
-        query = query.where(Users.username.ilike(f"%{search}%"))
+        query = query.where(Users.username.ilike(contains_pattern(search), escape="/"))
     result = await db.execute(query)
     return result.scalar()
 
@@ -64,7 +73,7 @@ async def get_users(
         .order_by(Users.username))
 
     if search:
-        query = query.where(Users.username.ilike(f"%{search}%"))
+        query = query.where(Users.username.ilike(contains_pattern(search), escape="/"))
 
     if last_username is not None:
         query = query.where(Users.username > last_username)
@@ -84,6 +93,90 @@ async def get_users(
         for user in users
     ]
 
+def aggregated_roles(user_id_column):
+    return (
+        select(func.array_agg(cast(UserRoles.role, String)))
+        .where(UserRoles.user_id == user_id_column)
+        .scalar_subquery()
+        .label('roles'))
+
+def role_values(names: Optional[List[str]]) -> Optional[List[str]]:
+    # Postgres hands back enum names, the API speaks enum values
+    return sorted(Roles[name].value for name in names) if names else None
+
+async def get_users_page(
+    db: AsyncSession,
+    search: str = "",
+    last_username: str = None,
+    limit: int = 20
+) -> ListPage:
+    """Page of active users with their roles, plus filtered and overall totals, in one query."""
+    search_filters = [Users.username.ilike(contains_pattern(search), escape="/")] if search else []
+    page_filters = [Users.is_active == True]
+    if last_username is not None:
+        page_filters.append(Users.username > last_username)
+
+    def roles_column(page):
+        return [aggregated_roles(page.c.id)]
+
+    page = await fetch_list_page(
+        db, 'users', Users,
+        columns=[Users.id, Users.discord_id, Users.username],
+        order_column=Users.username,
+        search_filters=search_filters,
+        page_filters=page_filters,
+        limit=limit,
+        extra_columns=roles_column)
+    for user in page.rows:
+        user['roles'] = role_values(user['roles'])
+    return page
+
+async def stream_users(
+    db: AsyncSession,
+    search: str = "",
+    last_username: str = None,
+    limit: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Active users with their roles, read through a server-side cursor."""
+    query = (
+        select(Users.id, Users.discord_id, Users.username, aggregated_roles(Users.id))
+        .where(Users.is_active == True)
+        .order_by(Users.username))
+    if search:
+        query = query.where(Users.username.ilike(contains_pattern(search), escape="/"))
+    if last_username is not None:
+        query = query.where(Users.username > last_username)
+    if limit is not None:
+        query = query.limit(limit)
+
+    result = await db.stream(query.execution_options(yield_per=config.STREAM_BATCH_SIZE))
+    async for row in result:
+        user = dict(row._mapping)
+        user['roles'] = role_values(user['roles'])
+        yield user
+
+async def search_users(db: AsyncSession, search: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Substring and fuzzy username search, prefix matches first, then by trigram similarity."""
+    query = (
+        select(Users)
+        .where(
+            Users.is_active == True,
+            Users.username.ilike(contains_pattern(search), escape="/") | Users.username.op('%')(search))
+        .order_by(
+            Users.username.ilike(f"{escape_like(search)}%", escape="/").desc(),
+            func.similarity(Users.username, search).desc(),
+            Users.username)
+        .limit(limit))
+    result = await db.execute(query)
+    return [
+        {
+            "id": user.id,
+            "discord_id": user.discord_id,
+            "username": user.username,
+        }
+        for user in result.scalars().all()
+    ]
+
 async def add_user_role(db: AsyncSession, user_id: int, role: Roles) -> bool:
     existing_role = await db.execute(
         select(UserRoles)
@@ -95,6 +188,7 @@ async def add_user_role(db: AsyncSession, user_id: int, role: Roles) -> bool:
     new_role = UserRoles(user_id=user_id, role=role)
     db.add(new_role)
     await db.commit()
+    await session_cache.invalidate_user(user_id)
     return True
 
 async def remove_user_role(db: AsyncSession, user_id: int, role: Roles) -> bool:
@@ -111,6 +205,7 @@ async def remove_user_role(db: AsyncSession, user_id: int, role: Roles) -> bool:
             UserRoles.user_id == user_id, 
             UserRoles.role == role))
     await db.commit()
+    await session_cache.invalidate_user(user_id)
     return True
 
 async def get_user_roles(db: AsyncSession, user_id: int) -> List[Roles]:
@@ -179,27 +274,64 @@ async def update_user_platform_mapping(db: AsyncSession, mapping: UserPlatformMa
         await db.refresh(mapping)
         return mapping
 
-async def get_match_making_leaderboard(db: AsyncSession, guild_id: int) -> List[Dict[str, Any]]:
+def _row_version(table) -> Any:
+    # xmin is set by every INSERT and UPDATE of a row, whatever column changed
+    return literal_column(f"{table.__tablename__}.xmin::text::bigint")
+
+async def get_match_making_leaderboard(
+    db: AsyncSession,
+    guild_id: int,
+    user_ids: Optional[List[int]] = None
+) -> List[Dict[str, Any]]:
+    stats = MMBotUserSummaryStats
+    games = cast(stats.games, Float)
+    query = (
+        select(
+            stats.user_id,
+            stats.mmr,
+            stats.games,
+            stats.wins,
+            (stats.wins / games).label('win_rate'),
+            (stats.total_kills / games).label('avg_kills'),
+            (stats.total_deaths / games).label('avg_deaths'),
+            (stats.total_assists / games).label('avg_assists'),
+            (stats.total_score / games).label('avg_score'))
+        .where(
+            stats.guild_id == int(guild_id),
+            stats.games > 0)
+        .order_by(desc(stats.mmr).nulls_last(), stats.user_id))
+    if user_ids is not None:
+        query = query.where(stats.user_id.in_(user_ids))
+    result = await db.execute(query)
+    return [dict(row._mapping) for row in result]
+
+async def get_match_making_leaderboard_fingerprint(db: AsyncSession, guild_id: int) -> tuple:
+    """Changes with every insert, update or delete of a ranked row.
+
+    An update or insert gives its row a new transaction id, larger than any in the
+    table, so the max moves; a delete changes the count.
+    """
+    stats = MMBotUserSummaryStats
+    version = _row_version(stats)
     result = await db.execute(
-        select(MMBotUserSummaryStats)
+        select(
+            func.count(),
+            func.max(version),
+            func.sum(version))
         .where(
-            MMBotUserSummaryStats.guild_id == int(guild_id),
-            MMBotUserSummaryStats.games > 0)
-        .order_by(desc(MMBotUserSummaryStats.mmr)))
-    return [
-        {
-            "user_id": row.MMBotUserSummaryStats.user_id,
-            "mmr": row.MMBotUserSummaryStats.mmr,
-            "games": row.MMBotUserSummaryStats.games,
-            "wins": row.MMBotUserSummaryStats.wins,
-            "win_rate": row.MMBotUserSummaryStats.wins / row.MMBotUserSummaryStats.games if row.MMBotUserSummaryStats.games > 0 else 0,
-            "avg_kills": row.MMBotUserSummaryStats.total_kills / row.MMBotUserSummaryStats.games if row.MMBotUserSummaryStats.games > 0 else 0,
-            "avg_deaths": row.MMBotUserSummaryStats.total_deaths / row.MMBotUserSummaryStats.games if row.MMBotUserSummaryStats.games > 0 else 0,
-            "avg_assists": row.MMBotUserSummaryStats.total_assists / row.MMBotUserSummaryStats.games if row.MMBotUserSummaryStats.games > 0 else 0,
-            "avg_score": row.MMBotUserSummaryStats.total_score / row.MMBotUserSummaryStats.games if row.MMBotUserSummaryStats.games > 0 else 0,
-        }
-        for row in result
-    ]
+            stats.guild_id == int(guild_id),
+            stats.games > 0))
+    return tuple(result.one())
+
+async def get_match_making_leaderboard_versions(db: AsyncSession, guild_id: int) -> Dict[int, int]:
+    """user_id -> row version of every ranked row, to find the ones that changed."""
+    stats = MMBotUserSummaryStats
+    result = await db.execute(
+        select(stats.user_id, _row_version(stats))
+        .where(
+            stats.guild_id == int(guild_id),
+            stats.games > 0))
+    return dict(result.all())
 
 async def get_team(db: AsyncSession, team_id: int) -> Optional[Teams]:
     query = select(Teams).where(Teams.id == team_id)
@@ -212,18 +344,10 @@ async def update_team(
     team_data: dict, 
     logo_file: UploadFile = None
 ) -> Optional[Dict[str, Any]]:
+    staged = None
     if logo_file:
-        file_extension = os.path.splitext(logo_file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-
-        os.makedirs(config.UPLOAD_DIR, exist_ok=True)
-        
-        file_path = os.path.join(config.UPLOAD_DIR, unique_filename)
-        with open(file_path, "wb") as buffer:
-            content = await logo_file.read()
-            buffer.write(content)
-        
-        team_data['logo_url'] = f"{config.CDN_BASE_URL}/{unique_filename}"
+        staged = await stage_upload(logo_file, config.UPLOAD_DIR, config.UPLOAD_MAX_BYTES)
+        team_data['logo_url'] = f"{config.CDN_BASE_URL}/{staged.filename}"
 
     query = (
         update(Teams)
@@ -231,23 +355,36 @@ async def update_team(
         .values(**team_data)
         .returning(Teams)
     )
-    result = await db.execute(query)
-    await db.commit()
-
-    updated_team = result.fetchone()
-    if updated_team:
-        return {
+    # The logo only takes its public name once the row pointing at it is committed
+    try:
+        result = await db.execute(query)
+        updated_team = result.scalars().first()
+        # Read before the commit expires the returned row
+        team = {
             "id": updated_team.id,
             "name": updated_team.name,
             "bio": updated_team.bio,
             "color1": updated_team.color1,
             "color2": updated_team.color2,
             "logo_url": updated_team.logo_url,
+            "logo_variants": logo_variant_urls(updated_team.logo_url),
             "display_trophy": updated_team.display_trophy,
-            "created_at": updated_team.created_at,
+            "timestamp": updated_team.timestamp,
             "disbanded_at": updated_team.disbanded_at
-        }
-    return None
+        } if updated_team else None
+        await db.commit()
+    except BaseException:
+        if staged:
+            await staged.discard()
+        raise
+
+    if staged:
+        if team:
+            # Until the variants exist the payload leaves them out, clients use logo_url
+            logo_variants.schedule(await staged.promote(), staged.digest)
+        else:
+            await staged.discard()
+    return team
 
 async def fetch_teams(
     db: AsyncSession,
@@ -258,7 +395,7 @@ async def fetch_teams(
     query = select(Teams).order_by(Teams.name)
 
     if search:
-        query = query.where(Teams.name.ilike(f"%{search}%"))
+        query = query.where(Teams.name.ilike(contains_pattern(search), escape="/"))
 
     if last_team_name is not None:
         query = query.where(Teams.name > last_team_name)
@@ -268,10 +405,48 @@ async def fetch_teams(
     result = await db.execute(query)
     return result.scalars().all()
 
+async def get_teams_page(
+    db: AsyncSession,
+    search: str = "",
+    last_team_name: str = None,
+    limit: int = 20,
+    active_only: bool = False
+) -> ListPage:
+    """Page of teams plus filtered and overall totals in one query."""
+    search_filters = [Teams.name.ilike(contains_pattern(search), escape="/")] if search else []
+    page_filters = [Teams.disbanded_at.is_(None)] if active_only else []
+    if last_team_name is not None:
+        page_filters.append(Teams.name > last_team_name)
+
+    return await fetch_list_page(
+        db, 'teams', Teams,
+        columns=[
+            Teams.id, Teams.name, Teams.bio, Teams.color1, Teams.color2,
+            Teams.logo_url, Teams.display_trophy, Teams.timestamp, Teams.disbanded_at],
+        order_column=Teams.name,
+        search_filters=search_filters,
+        page_filters=page_filters,
+        limit=limit)
+
+async def search_teams(db: AsyncSession, search: str, limit: int = 20) -> List[Teams]:
+    """Substring and fuzzy team name search, prefix matches first, then by trigram similarity."""
+    query = (
+        select(Teams)
+        .where(
+            Teams.disbanded_at.is_(None),
+            Teams.name.ilike(contains_pattern(search), escape="/") | Teams.name.op('%')(search))
+        .order_by(
+            Teams.name.ilike(f"{escape_like(search)}%", escape="/").desc(),
+            func.similarity(Teams.name, search).desc(),
+            Teams.name)
+        .limit(limit))
+    result = await db.execute(query)
+    return result.scalars().all()
+
 async def total_team_count(db: AsyncSession, search: Optional[str] = None) -> int:
     query = select(func.count(Teams.id))
     if search:
-        query = query.where(Teams.name.ilike(f"%{search}%"))
+        query = query.where(Teams.name.ilike(contains_pattern(search), escape="/"))
     result = await db.execute(query)
     return result.scalar()
 
@@ -295,7 +470,7 @@ async def get_team_members(db: AsyncSession, team_id: int) -> List[Dict[str, Any
             "id": member.id,
             "discord_id": member.discord_id,
             "username": member.username,
-            "joined_at": member.joined_at.isoformat() if member.joined_at else None
+            "joined_at": member.joined_at
         } for member in members
     ]
 
@@ -390,6 +565,7 @@ async def get_user_team(db: AsyncSession, user_id: int) -> Optional[Dict[str, An
             "id": team.id,
             "name": team.name,
             "logo_url": team.logo_url,
+            "logo_variants": logo_variant_urls(team.logo_url),
             "joined_at": joined_at
         }
     return None
@@ -403,6 +579,7 @@ async def create_team(db: AsyncSession, team_data: dict, creator_id: int) -> Tea
     await add_team_captain(db, team.id, creator_id)
 
     await db.commit()
+    invalidate_total('teams')
     return team
 
 async def disband_team(db: AsyncSession, team_id: int) -> bool:
@@ -435,7 +612,7 @@ async def get_active_teams(
     query = select(Teams).where(Teams.disbanded_at.is_(None)).order_by(Teams.name)
 
     if search:
-        query = query.where(Teams.name.ilike(f"%{search}%"))
+        query = query.where(Teams.name.ilike(contains_pattern(search), escape="/"))
 
     if last_team_name is not None:
         query = query.where(Teams.name > last_team_name)
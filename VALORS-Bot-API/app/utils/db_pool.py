@@ -0,0 +1,90 @@
+import time
+from typing import Dict
+
+from greenlet import getcurrent, greenlet
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that tracks waiters, acquire time and connect time.
+
+    A checkout is a waiter only when the pool and its overflow are exhausted, and
+    its acquire time leaves out opening a new connection, which is reported as
+    connect time. Checkouts only ever happen on the event loop thread (inside
+    SQLAlchemy's greenlet bridge), so plain counters are enough.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.acquisitions = 0
+        self.acquire_timeouts = 0
+        self.acquire_time_total = 0.0
+        self.acquire_time_max = 0.0
+        self.connects = 0
+        self.connect_time_total = 0.0
+        self.connect_time_max = 0.0
+        # Connect time of the checkouts in progress, by the greenlet running each
+        self._checkout_connect_time: Dict[greenlet, float] = {}
+
+    def _exhausted(self) -> bool:
+        return self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+
+    def _do_get(self):
+        exhausted = self._exhausted()
+        if exhausted:
+            self.waiting += 1
+        checkout = getcurrent()
+        self._checkout_connect_time[checkout] = 0.0
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.acquire_timeouts += 1
+            raise
+        finally:
+            if exhausted:
+                self.waiting -= 1
+            connect_time = self._checkout_connect_time.pop(checkout)
+        elapsed = time.perf_counter() - start - connect_time
+        self.acquisitions += 1
+        self.acquire_time_total += elapsed
+        self.acquire_time_max = max(self.acquire_time_max, elapsed)
+        return connection
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.connects += 1
+            self.connect_time_total += elapsed
+            self.connect_time_max = max(self.connect_time_max, elapsed)
+            checkout = getcurrent()
+            if checkout in self._checkout_connect_time:
+                self._checkout_connect_time[checkout] += elapsed
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # QueuePool reports unused pool slots as negative overflow
+        "overflow_in_use": max(0, pool.overflow()),
+    }
+    if isinstance(pool, InstrumentedAsyncPool):
+        stats.update({
+            "waiting": pool.waiting,
+            "acquisitions": pool.acquisitions,
+            "acquire_timeouts": pool.acquire_timeouts,
+            "acquire_time_total_ms": pool.acquire_time_total * 1000,
+            "acquire_time_avg_ms": pool.acquire_time_total * 1000 / pool.acquisitions if pool.acquisitions else 0,
+            "acquire_time_max_ms": pool.acquire_time_max * 1000,
+            "connects": pool.connects,
+            "connect_time_total_ms": pool.connect_time_total * 1000,
+            "connect_time_max_ms": pool.connect_time_max * 1000,
+        })
+    return stats
\ No newline at end of file
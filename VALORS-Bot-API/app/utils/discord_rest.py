@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from config import config
+from .logger import log
+from .metrics import count_call
+
+# Discord scopes rate limits per route and "major parameter", every other id is
+# collapsed so e.g. all member role updates of one guild share a bucket.
+_MINOR_ID = re.compile(r'(?<!guilds/)(?<!channels/)(?<!webhooks/)\b\d{5,}\b')
+_MAJOR_ID = re.compile(r'(?:guilds|channels|webhooks)/(\d+)')
+
+
+class _Bucket:
+    """Local view of one Discord rate-limit bucket.
+
+    Until the first response tells us the limits, only one request is let
+    through; everyone else waits on the condition instead of stampeding.
+    """
+    def __init__(self):
+        self.cond = asyncio.Condition()
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self.window = 1.0
+        self.inflight = 0
+
+    async def acquire(self):
+        async with self.cond:
+            while True:
+                now = time.monotonic()
+                if self.remaining is not None and now >= self.reset_at:
+                    # Assume a fresh window until a response says otherwise
+                    self.remaining = self.limit
+                    self.reset_at = now + self.window
+                if self.remaining is None:
+                    if self.inflight == 0:
+                        break
+                    await self.cond.wait()
+                elif self.remaining > 0:
+                    self.remaining -= 1
+                    break
+                else:
+                    try:
+                        await asyncio.wait_for(self.cond.wait(), self.reset_at - now)
+                    except asyncio.TimeoutError:
+                        pass
+            self.inflight += 1
+
+    async def release(self, headers: Optional[httpx.Headers] = None):
+        async with self.cond:
+            self.inflight -= 1
+            if headers is not None:
+                self._update(headers)
+            self.cond.notify_all()
+
+    def _update(self, headers: httpx.Headers):
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        if remaining is None or reset_after is None:
+            return
+        limit = headers.get('X-RateLimit-Limit')
+        if limit is not None:
+            self.limit = int(limit)
+            if int(remaining) == self.limit - 1:
+                self.window = float(reset_after)
+        reset_at = time.monotonic() + float(reset_after)
+        if self.remaining is None or reset_at > self.reset_at + 0.05:
+            # New window, requests still in flight will be counted against it
+            self.remaining = max(0, int(remaining) - self.inflight)
+        else:
+            self.remaining = min(self.remaining, int(remaining))
+        self.reset_at = reset_at
+
+
+class DiscordREST:
+    """Application-wide Discord REST client.
+
+    One pooled keep-alive httpx client is shared by every caller. Requests are
+    scheduled per rate-limit bucket (learned from X-RateLimit-Bucket) and wait for
+    the bucket to reset instead of failing; 429s are retried after `retry_after`.
+    """
+    def __init__(self, base_url: str, bot_token: str, max_retries: int = 3, max_connections: int = 20):
+        self.base_url = base_url
+        self.bot_token = bot_token
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._route_buckets: Dict[str, str] = {}
+        self._buckets: Dict[str, _Bucket] = {}
+        self._global_reset_at = 0.0
+        self.requests = 0
+        self.rate_limited = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={'Authorization': f'Bot {self.bot_token}'},
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60),
+                timeout=httpx.Timeout(10.0))
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def route_key(method: str, path: str, scope: Optional[str] = None) -> str:
+        key = f"{method} {_MINOR_ID.sub('{id}', path.split('?')[0])}"
+        # Scopes are credentials, only a digest of them ends up in keys and logs
+        return f"{key} {hashlib.sha1(scope.encode()).hexdigest()[:12]}" if scope else key
+
+    def _bucket(self, route: str) -> _Bucket:
+        bucket_id = self._route_buckets.get(route, route)
+        bucket = self._buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self._buckets[bucket_id] = _Bucket()
+        return bucket
+
+    def _learn_bucket(self, route: str, bucket: _Bucket, headers: httpx.Headers):
+        # Routes sharing a bucket hash share limits, but only for the same major ids
+        bucket_hash = headers.get('X-RateLimit-Bucket')
+        if bucket_hash and route not in self._route_buckets:
+            path, _, scope = route.split(' ', 1)[1].partition(' ')
+            majors = ','.join(_MAJOR_ID.findall(path))
+            bucket_id = f"{bucket_hash}:{majors}:{scope}"
+            self._route_buckets[route] = bucket_id
+            # Keep what the route already learned when it is the first of its bucket
+            self._buckets.setdefault(bucket_id, bucket)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        bucket_scope: Optional[str] = None,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """Sends a request, queueing on its rate-limit bucket.
+
+        `bucket_scope` separates buckets that Discord tracks per credential, e.g.
+        the access token of a user-authorized call.
+        """
+        route = self.route_key(method, path, bucket_scope)
+        for attempt in range(self.max_retries + 1):
+            global_delay = self._global_reset_at - time.monotonic()
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+            bucket = self._bucket(route)
+            await bucket.acquire()
+
+            self.requests += 1
+            count_call('discord')
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except Exception:
+                await bucket.release()
+                raise
+            await bucket.release(response.headers)
+            self._learn_bucket(route, bucket, response.headers)
+
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+
+            self.rate_limited += 1
+            retry_after = self._retry_after(response)
+            if response.headers.get('X-RateLimit-Global') or response.headers.get('X-RateLimit-Scope') == 'global':
+                self._global_reset_at = time.monotonic() + retry_after
+            log.warning("Discord rate limited %s, retrying in %.2fs", route, retry_after)
+            await asyncio.sleep(retry_after)
+        return response
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float:
+        try:
+            return float(response.json()['retry_after'])
+        except Exception:
+            return float(response.headers.get('Retry-After', 1))
+
+
+discord_rest = DiscordREST(config.DISCORD_API_ENDPOINT, config.DISCORD_BOT_TOKEN)
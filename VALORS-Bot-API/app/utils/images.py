@@ -0,0 +1,181 @@
+import asyncio
+import multiprocessing
+import os
+import re
+import tempfile
+import warnings
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+
+from cachetools import TTLCache
+from PIL import Image
+from config import config
+from .logger import log
+from .uploads import TEMP_PREFIX, TEMP_SUFFIX, run_file_io
+
+# Name of a content-addressed upload, see uploads.StagedUpload.filename
+_CONTENT_ADDRESSED = re.compile(r'([0-9a-f]{64})(\.[^./]*)?')
+_VARIANT = re.compile(r'([0-9a-f]{64})_(\d+)\.webp')
+
+
+def variant_filename(digest: str, size: int) -> str:
+    return f"{digest}_{size}.webp"
+
+
+def logo_variant_urls(logo_url: Optional[str]) -> Optional[Dict[str, str]]:
+    """Size -> URL of the WebP variants of a logo, None until they have been rendered.
+
+    Logos stored before variants existed, and uploads Pillow cannot read, never
+    get any; clients keep using `logo_url` for those.
+    """
+    prefix = f"{config.CDN_BASE_URL}/"
+    if not logo_url or not logo_url.startswith(prefix):
+        return None
+    match = _CONTENT_ADDRESSED.fullmatch(logo_url[len(prefix):])
+    if not match or not logo_variants.is_rendered(match.group(1)):
+        return None
+    return {str(size): f"{prefix}{variant_filename(match.group(1), size)}" for size in reversed(logo_variants.sizes)}
+
+
+class VariantRenderer:
+    """Renders resized WebP variants of uploaded images in the background.
+
+    Rendering runs in a process pool, the source is decoded once and scaled down
+    from the largest size to the smallest. Every variant is written under a
+    temporary name and renamed into place, so a variant that exists is complete.
+    The pool starts its workers with "spawn", never forking the threaded server.
+
+    Which digests have their variants is read from one listing of the directory
+    at start. Digests missing from it, which another worker may have rendered
+    since, are looked up on disk in the upload executor, never on the event
+    loop, at most once every `MISSING_TTL` seconds; until a lookup finds them
+    they count as not rendered.
+    """
+    MISSING_TTL = 10
+
+    def __init__(self, directory: str, sizes: List[int], quality: int, workers: int):
+        self.directory = directory
+        self.sizes = sorted(sizes, reverse=True)
+        self.quality = quality
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._rendered: Set[str] = set()
+        self._missing = TTLCache(maxsize=4096, ttl=self.MISSING_TTL)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self):
+        self._start_pool()
+        self._rendered.update(self._scan())
+
+    def _start_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def _scan(self) -> Set[str]:
+        """Digests with every variant in the directory, from a single listing."""
+        sizes = set(self.sizes)
+        counts = Counter()
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    match = _VARIANT.fullmatch(entry.name)
+                    if match and int(match.group(2)) in sizes:
+                        counts[match.group(1)] += 1
+        except FileNotFoundError:
+            return set()
+        return {digest for digest, count in counts.items() if count == len(sizes)}
+
+    def is_rendered(self, digest: str) -> bool:
+        if digest in self._rendered:
+            return True
+        if digest not in self._missing:
+            self._missing[digest] = True
+            self._spawn(self._lookup(digest))
+        return False
+
+    def schedule(self, source: str, digest: str):
+        """Renders the variants of the stored upload `source` in the background."""
+        if digest in self._rendered:
+            return
+        self._spawn(self._render(source, digest))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _lookup(self, digest: str):
+        try:
+            found = await run_file_io(_has_variants, self.directory, digest, self.sizes)
+        except OSError as e:
+            log.error("Looking up variants of %s failed: %s", digest, e)
+            return
+        if found:
+            self._missing.pop(digest, None)
+            self._rendered.add(digest)
+
+    async def _render(self, source: str, digest: str):
+        self._start_pool()
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._pool, _render_variants, source, self.directory, digest, self.sizes, self.quality)
+        except ValueError as e:
+            log.warning("No variants for %s: %s", source, e)
+            return
+        except Exception as e:
+            log.error("Rendering variants of %s failed: %s", source, e)
+            return
+        self._missing.pop(digest, None)
+        self._rendered.add(digest)
+
+    async def stop(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+def _has_variants(directory: str, digest: str, sizes: List[int]) -> bool:
+    return all(os.path.exists(os.path.join(directory, variant_filename(digest, size))) for size in sizes)
+
+
+def _render_variants(source: str, directory: str, digest: str, sizes: List[int], quality: int):
+    """Runs in the pool: writes the variants missing from `directory`."""
+    pending = [size for size in sizes if not _has_variants(directory, digest, [size])]
+    if not pending:
+        return
+
+    try:
+        with warnings.catch_warnings():
+            # Anything past Pillow's pixel limit is more likely an attack than a logo
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(source) as image:
+                # JPEGs decode straight at a fraction of their size when that is enough
+                image.draft('RGB', (pending[0], pending[0]))
+                has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+    except (OSError, Image.DecompressionBombWarning, Image.DecompressionBombError) as e:
+        raise ValueError(f"not a readable image ({type(e).__name__})") from None
+
+    for size in pending:
+        # In place, each variant is scaled from the previous, larger one
+        image.thumbnail((size, size), Image.LANCZOS)
+        fd, temp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=TEMP_SUFFIX, dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                image.save(out, 'WEBP', quality=quality)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, os.path.join(directory, variant_filename(digest, size)))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+logo_variants = VariantRenderer(
+    config.UPLOAD_DIR,
+    config.LOGO_VARIANT_SIZES,
+    config.LOGO_VARIANT_QUALITY,
+    config.IMAGE_WORKERS)
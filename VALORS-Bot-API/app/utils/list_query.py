@@ -0,0 +1,79 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from cachetools import TTLCache
+from sqlalchemy import true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+from config import config
+
+# Overall row counts per list, dropped on insert. Other workers catch up within the TTL.
+_totals = TTLCache(maxsize=32, ttl=config.LIST_TOTAL_CACHE_TTL)
+
+
+class ListPage(NamedTuple):
+    rows: List[Dict[str, Any]]
+    filtered_total: int
+    total: int
+
+
+def invalidate_total(key: str):
+    _totals.pop(key, None)
+
+
+async def fetch_list_page(
+    db: AsyncSession,
+    total_key: str,
+    table,
+    columns: Sequence,
+    order_column,
+    search_filters: Sequence = (),
+    page_filters: Sequence = (),
+    limit: int = 20,
+    extra_columns: Optional[Callable[[Any], Sequence]] = None
+) -> ListPage:
+    """Returns a keyset page, the filtered total and the overall total in one statement.
+
+    `search_filters` apply to both the page and the filtered count, `page_filters`
+    (active flags, keyset position) only to the page. `extra_columns` receives the
+    page CTE and may add correlated columns such as aggregated roles.
+    """
+    page = (
+        select(*columns)
+        .where(*search_filters, *page_filters)
+        .order_by(order_column)
+        .limit(limit)
+        .cte('page'))
+
+    total = _totals.get(total_key)
+    count_columns = [func.count().label('filtered_total')]
+    if total is None:
+        count_columns.append(
+            select(func.count()).select_from(table).correlate(None).scalar_subquery().label('total'))
+    counts = (
+        select(*count_columns)
+        .select_from(table)
+        .where(*search_filters)
+        .cte('counts'))
+
+    order_key = order_column.key
+    page_columns = list(page.c) + list(extra_columns(page) if extra_columns else [])
+    result = await db.execute(
+        select(counts, *page_columns)
+        .select_from(counts.outerjoin(page, true()))
+        .order_by(page.c[order_key]))
+
+    rows = []
+    filtered_total = 0
+    for row in result:
+        mapping = row._mapping
+        filtered_total = mapping['filtered_total']
+        if total is None:
+            total = mapping['total']
+        # The counts row is still returned, with NULL page columns, when the page is empty
+        if mapping[order_key] is None:
+            continue
+        rows.append({column.key: mapping[column.key] for column in page_columns})
+
+    _totals[total_key] = total
+    return ListPage(rows, filtered_total, total)
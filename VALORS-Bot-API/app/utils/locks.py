@@ -0,0 +1,23 @@
+import asyncio
+from typing import Optional
+
+
+class LazyLock:
+    """An asyncio.Lock created on first use.
+
+    On Python 3.9 a lock binds to the event loop current at construction, which
+    for a module-level instance may not be the app's.
+    """
+    def __init__(self):
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _get(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def __aenter__(self):
+        await self._get().acquire()
+
+    async def __aexit__(self, *exc_info):
+        self._lock.release()
@@ -1,7 +1,14 @@
+import atexit
 import inspect
+import os
+import queue
 import sys
+import threading
+import time
 from datetime import datetime
 from pprint import pprint
+from types import CodeType
+from typing import Dict, Optional, Tuple
 from config import config
 
 class VariableLog:
@@ -23,8 +30,88 @@ class VariableLog:
             Logger.debug(f"{message}{' ' if message else ''}{variable_name} => {value}")
 
 
+class _Writer:
+    """Writes log lines to stderr from a daemon thread.
+
+    Callers only enqueue, so logging never blocks the event loop on a slow or
+    piped stderr. Whatever is queued when the process exits is still flushed.
+    """
+    _STOP = None
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def put(self, record: Tuple[str, str, str]):
+        if self._closed:
+            # Late records (atexit handlers, interpreter shutdown) are written inline
+            self._write([record])
+            return
+        if self._pid != os.getpid():
+            self._start()
+        self._queue.put(record)
+
+    def _start(self):
+        # Threads do not survive a fork, a forked worker starts its own writer
+        with self._lock:
+            if self._pid != os.getpid():
+                if self._thread is None:
+                    atexit.register(self.close)
+                self._queue = queue.SimpleQueue()
+                self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            records = [self._queue.get()]
+            try:
+                while True:
+                    records.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            stop = self._STOP in records
+            self._write([record for record in records if record is not self._STOP])
+            if stop:
+                return
+
+    @staticmethod
+    def _write(records):
+        if not records:
+            return
+        stream = sys.stderr
+        try:
+            stream.write(''.join(Logger._format(*record) for record in records))
+            stream.flush()
+        except Exception:
+            pass
+
+    def close(self, timeout: float = 2.0):
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+
+
 class Logger:
+    """Colored stderr logger.
+
+    Messages may be passed printf-style, `log.info("Mapping: %s", mapping)`, so
+    filtered or rate-limited records are never formatted. Each call site may log
+    LOG_RATE_LIMIT records per second (bursts of LOG_RATE_BURST); the number of
+    records dropped is appended to the next one that gets through.
+    """
     _log_level = config.LOG_LEVEL
+    _writer = _Writer()
+    # Caller names never change for a given code object, resolve each one once
+    _callers: Dict[CodeType, str] = {}
+    # Token bucket per call site: (code, line) -> [tokens, last refill, suppressed]
+    _rate_limit = config.LOG_RATE_LIMIT
+    _rate_burst = config.LOG_RATE_BURST
+    _sites: Dict[Tuple[CodeType, int], list] = {}
 
     DEBUG = 1
     INFO = 2
@@ -48,39 +135,85 @@ class Logger:
     def _get_timestamp():
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
 
+    @classmethod
+    def _get_caller_class(cls, frame):
+        if frame is None:
+            return ''
+        code = frame.f_code
+        caller = cls._callers.get(code)
+        if caller is None:
+            caller = cls._callers[code] = cls._resolve_caller(frame)
+        return caller
+
+    @classmethod
+    def _take_token(cls, site) -> int:
+        """-1 if the call site is over its rate, else how many records it had suppressed."""
+        now = time.monotonic()
+        bucket = cls._sites.get(site)
+        if bucket is None:
+            cls._sites[site] = [cls._rate_burst - 1, now, 0]
+            return 0
+        tokens = min(cls._rate_burst, bucket[0] + (now - bucket[1]) * cls._rate_limit)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            bucket[2] += 1
+            return -1
+        bucket[0] = tokens - 1
+        suppressed, bucket[2] = bucket[2], 0
+        return suppressed
+
     @staticmethod
-    def _get_caller_class():
-        current_frame = inspect.currentframe()
-        try:
-            for _ in range(3):  # Skip Logger frames
-                if current_frame is not None:
-                    current_frame = current_frame.f_back
-            
-            if current_frame is not None:
-                frame_info = inspect.getframeinfo(current_frame)
-                module = inspect.getmodule(current_frame)
-                if module:
-                    for name, obj in module.__dict__.items():
-                        if inspect.isclass(obj):
-                            for attr, value in obj.__dict__.items():
-                                if getattr(value, '__code__', None) is current_frame.f_code:
-                                    return obj.__name__
-                return frame_info.function
-        finally:
-            del current_frame  # Avoid reference cycles
-
-        return ''
+    def _resolve_caller(frame):
+        module = inspect.getmodule(frame)
+        if module:
+            for name, obj in module.__dict__.items():
+                if inspect.isclass(obj):
+                    for attr, value in obj.__dict__.items():
+                        if getattr(value, '__code__', None) is frame.f_code:
+                            return obj.__name__
+        return frame.f_code.co_name
 
     @classmethod
-    def _log(cls, level, message):
-        timestamp = cls._get_timestamp()
-        caller_class = cls._get_caller_class()
+    def _format(cls, level, caller_class, message):
         color = cls._COLORS.get(level, cls._COLORS['RESET'])
         reset = cls._COLORS['RESET']
-        bg = cls._COLORS['BG']
         gray = cls._COLORS['GRAY']
         purple = cls._COLORS['PURPLE']
-        print(f"{gray}[{purple}{caller_class}{gray}] {color}|{level}| {reset}{message}{reset}", file=sys.stderr)
+        return f"{gray}[{purple}{caller_class}{gray}] {color}|{level}| {reset}{message}{reset}\n"
+
+    @staticmethod
+    def _render(message, args):
+        if not args:
+            return str(message)
+        try:
+            return message % args
+        except (TypeError, ValueError):
+            return f"{message} {args}"
+
+    @classmethod
+    def _log(cls, level, message, args=()):
+        try:
+            frame = sys._getframe(2)  # Skip Logger frames
+        except ValueError:
+            frame = None
+
+        suppressed = 0
+        if frame is not None and cls._rate_limit > 0:
+            suppressed = cls._take_token((frame.f_code, frame.f_lineno))
+            if suppressed < 0:
+                return
+
+        message = cls._render(message, args)
+        if suppressed:
+            message = f"{message} ({suppressed} similar messages suppressed)"
+        cls._writer.put((level, cls._get_caller_class(frame), message))
+
+    @classmethod
+    def flush(cls):
+        """Blocks until every queued record is written, e.g. before a hard exit."""
+        cls._writer.close()
+        cls._writer = _Writer()
     
     @classmethod
     def get_level(cls):
@@ -89,6 +222,13 @@ class Logger:
     @classmethod
     def set_level(cls, level: int):
         cls._log_level = level
+
+    @classmethod
+    def set_rate_limit(cls, rate: float, burst: int):
+        """Records per second and burst allowed per call site, a rate of 0 disables the limit."""
+        cls._rate_limit = rate
+        cls._rate_burst = burst
+        cls._sites.clear()
     
     @classmethod
     def pretty(cls, obj):
@@ -97,34 +237,34 @@ class Logger:
         pprint(obj)
 
     @classmethod
-    def debug(cls, message):
+    def debug(cls, message, *args):
         if cls._log_level > cls.DEBUG:
             return
-        cls._log('DEBUG', message)
+        cls._log('DEBUG', message, args)
 
     @classmethod
-    def info(cls, message):
+    def info(cls, message, *args):
         if cls._log_level > cls.INFO:
             return
-        cls._log('INFO', message)
+        cls._log('INFO', message, args)
 
     @classmethod
-    def warning(cls, message):
+    def warning(cls, message, *args):
         if cls._log_level > cls.WARNING:
             return
-        cls._log('WARNING', message)
+        cls._log('WARNING', message, args)
 
     @classmethod
-    def error(cls, message):
+    def error(cls, message, *args):
         if cls._log_level > cls.ERROR:
             return
-        cls._log('ERROR', message)
+        cls._log('ERROR', message, args)
 
     @classmethod
-    def critical(cls, message):
+    def critical(cls, message, *args):
         if cls._log_level > cls.CRITICAL:
             return
-        cls._log('CRITICAL', message)
+        cls._log('CRITICAL', message, args)
 
 
 log = Logger()
\ No newline at end of file
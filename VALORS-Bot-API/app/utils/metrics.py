@@ -0,0 +1,214 @@
+import asyncio
+import bisect
+import contextvars
+import json
+import os
+import socket
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aioredis
+from aioredis.client import Pipeline
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from config import config
+from .logger import log
+
+# Upper bounds in seconds, Prometheus' defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_KINDS = ('db', 'redis', 'discord')
+
+RequestKey = Tuple[str, str, str]  # method, route template, status
+
+# Calls made while handling the current request, None outside of requests
+_request_calls: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar('request_calls', default=None)
+
+
+def count_call(kind: str):
+    """Counts one DB, Redis or Discord call, against the current request if there is one."""
+    metrics.calls[kind] += 1
+    calls = _request_calls.get()
+    if calls is not None:
+        calls[kind] += 1
+
+
+class Metrics:
+    """Request latency histograms and call counters of this worker.
+
+    Every worker publishes its snapshot to a Redis hash in the background and
+    /metrics merges the snapshots of all live workers, so any worker can answer
+    a scrape for the whole deployment.
+    """
+    KEY = 'metrics:workers'
+
+    def __init__(self, publish_interval: float):
+        self.publish_interval = publish_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.requests: Dict[RequestKey, List[float]] = {}
+        self.request_calls: Dict[RequestKey, Dict[str, int]] = {}
+        self.calls: Dict[str, int] = dict.fromkeys(CALL_KINDS, 0)
+        self._redis: Optional[aioredis.Redis] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def bind(self, redis: aioredis.Redis):
+        self._redis = redis
+
+    def start_request(self) -> contextvars.Token:
+        return _request_calls.set(dict.fromkeys(CALL_KINDS, 0))
+
+    def finish_request(self, token: contextvars.Token, method: str, route: str, status: int, duration: float):
+        calls = _request_calls.get()
+        _request_calls.reset(token)
+        key = (method, route, str(status))
+
+        # Layout: one count per bucket, then +Inf, sum and count
+        series = self.requests.get(key)
+        if series is None:
+            series = self.requests[key] = [0] * (len(BUCKETS) + 3)
+            self.request_calls[key] = dict.fromkeys(CALL_KINDS, 0)
+        series[bisect.bisect_left(BUCKETS, duration)] += 1
+        series[-2] += duration
+        series[-1] += 1
+
+        totals = self.request_calls[key]
+        for kind, count in calls.items():
+            totals[kind] += count
+
+    def snapshot(self) -> dict:
+        return {
+            'requests': [[*key, series, self.request_calls[key]] for key, series in self.requests.items()],
+            'calls': self.calls,
+        }
+
+    async def collect(self) -> List[dict]:
+        """Snapshots of every worker that published recently, this one always included."""
+        snapshots = {self.worker_id: self.snapshot()}
+        if self._redis is None:
+            return list(snapshots.values())
+        try:
+            published = await self._redis.hgetall(self.KEY)
+        except Exception as e:
+            log.error("Metrics collection failed: %s", e)
+            return list(snapshots.values())
+
+        cutoff = time.time() - 3 * self.publish_interval
+        departed = []
+        for worker_id, raw in published.items():
+            data = json.loads(raw)
+            if data['published_at'] < cutoff:
+                departed.append(worker_id)
+            elif worker_id != self.worker_id:
+                snapshots[worker_id] = data['snapshot']
+        if departed:
+            # Workers that died without cleaning up after themselves
+            await self._redis.hdel(self.KEY, *departed)
+        return list(snapshots.values())
+
+    async def render(self) -> str:
+        requests: Dict[RequestKey, List[float]] = {}
+        request_calls: Dict[RequestKey, Dict[str, int]] = {}
+        calls = dict.fromkeys(CALL_KINDS, 0)
+        for snapshot in await self.collect():
+            for method, route, status, series, counts in snapshot['requests']:
+                key = (method, route, status)
+                merged = requests.setdefault(key, [0] * len(series))
+                for index, value in enumerate(series):
+                    merged[index] += value
+                merged_calls = request_calls.setdefault(key, dict.fromkeys(CALL_KINDS, 0))
+                for kind, count in counts.items():
+                    merged_calls[kind] += count
+            for kind, count in snapshot['calls'].items():
+                calls[kind] += count
+
+        lines = [
+            '# HELP valors_http_request_duration_seconds Request latency by route template.',
+            '# TYPE valors_http_request_duration_seconds histogram',
+        ]
+        for (method, route, status), series in sorted(requests.items()):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, '+Inf'), series):
+                cumulative += count
+                lines.append(f'valors_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'valors_http_request_duration_seconds_sum{{{labels}}} {series[-2]}')
+            lines.append(f'valors_http_request_duration_seconds_count{{{labels}}} {series[-1]}')
+
+        lines += [
+            '# HELP valors_http_request_calls_total DB, Redis and Discord calls made by requests, by route template.',
+            '# TYPE valors_http_request_calls_total counter',
+        ]
+        for (method, route, status), counts in sorted(request_calls.items()):
+            for kind, count in counts.items():
+                lines.append(
+                    f'valors_http_request_calls_total{{method="{method}",route="{_escape(route)}",'
+                    f'status="{status}",kind="{kind}"}} {count}')
+
+        lines += [
+            '# HELP valors_calls_total DB, Redis and Discord calls, including background work.',
+            '# TYPE valors_calls_total counter',
+        ]
+        lines += [f'valors_calls_total{{kind="{kind}"}} {count}' for kind, count in calls.items()]
+        return '\n'.join(lines) + '\n'
+
+    async def publish(self):
+        if self._redis is None:
+            return
+        await self._redis.hset(self.KEY, self.worker_id, json.dumps({
+            'published_at': time.time(),
+            'snapshot': self.snapshot(),
+        }))
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._redis is not None:
+            try:
+                await self._redis.hdel(self.KEY, self.worker_id)
+            except Exception as e:
+                log.error("Metrics cleanup failed: %s", e)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.publish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("Metrics publishing failed: %s", e)
+            await asyncio.sleep(self.publish_interval)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def count_db_calls(engine: AsyncEngine):
+    event.listen(engine.sync_engine, 'before_cursor_execute', _count_db_call)
+
+
+def _count_db_call(*args):
+    count_call('db')
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        count_call('redis')
+        return await super().execute(raise_on_error)
+
+
+class InstrumentedRedis(aioredis.Redis):
+    """Redis client that counts round trips, a pipeline counts as one."""
+    async def execute_command(self, *args, **options):
+        count_call('redis')
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+metrics = Metrics(config.METRICS_PUBLISH_INTERVAL)
@@ -1,26 +1,67 @@
-import os
-import select
-import time
+import asyncio
 import errno
+import os
+
+from .logger import log
+
+# How often to retry opening a FIFO nobody is reading yet
+OPEN_RETRY_INTERVAL = 0.1
+
+
+async def write_to_pipe(pipe_path: str, message: str, timeout: float = 5) -> bool:
+    """Writes `message` as one line to a FIFO without blocking the event loop.
+
+    Waits up to `timeout` seconds for a reader to open the FIFO and for room in
+    its buffer. Lines up to PIPE_BUF (4 KiB) are written atomically.
+    """
+    data = (message + '\n').encode('utf-8')
+    try:
+        await asyncio.wait_for(_write(pipe_path, data), timeout)
+        return True
+    except asyncio.TimeoutError:
+        log.error("Timed out writing to %s, is anything reading it?", pipe_path)
+    except OSError as e:
+        log.error("Writing to %s failed: %s", pipe_path, e)
+    return False
+
 
-def write_to_pipe_with_timeout(pipe_path, message, timeout=5):
-    start_time = time.time()
-    while time.time() - start_time < timeout:
+async def _open_for_writing(pipe_path: str) -> int:
+    while True:
         try:
-            pipe_fd = os.open(pipe_path, os.O_WRONLY)
-            try:
-                os.set_blocking(pipe_fd, False)
-                _, ready_to_write, _ = select.select([], [pipe_fd], [], timeout)
-                if ready_to_write:
-                    encoded_message = (message + '\n').encode('utf-8')
-                    bytes_written = os.write(pipe_fd, encoded_message)
-                    if bytes_written == len(encoded_message):
-                        return True
-            finally:
-                os.close(pipe_fd)
+            return os.open(pipe_path, os.O_WRONLY | os.O_NONBLOCK)
         except OSError as e:
-            if e.errno in (errno.ENXIO, errno.EINTR):
-                time.sleep(0.1)
-            else:
-                return False
-    return False
\ No newline at end of file
+            # ENXIO: the FIFO has no reader yet
+            if e.errno not in (errno.ENXIO, errno.EINTR):
+                raise
+        await asyncio.sleep(OPEN_RETRY_INTERVAL)
+
+
+async def _write(pipe_path: str, data: bytes):
+    fd = await _open_for_writing(pipe_path)
+    try:
+        pending = memoryview(data)
+        while pending:
+            await _writable(fd)
+            try:
+                written = os.write(fd, pending)
+            except BlockingIOError:
+                # Another writer took the room first
+                continue
+            pending = pending[written:]
+    finally:
+        os.close(fd)
+
+
+async def _writable(fd: int):
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+
+    def on_writable():
+        if not ready.done():
+            ready.set_result(None)
+
+    loop.add_writer(fd, on_writable)
+    try:
+        await ready
+    finally:
+        loop.remove_writer(fd)
@@ -0,0 +1,121 @@
+import contextvars
+import functools
+import re
+import time
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from config import config
+from .logger import log
+
+_WHITESPACE = re.compile(r'\s+')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\$\d+|%\([^)]+\)s|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r'\bIN \((?:\?(?:::\w+)?, )*\?(?:::\w+)?\)', re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapses literals, bind parameters and IN lists so repeated queries compare equal."""
+    statement = _LITERAL.sub('?', _WHITESPACE.sub(' ', statement).strip())
+    return _IN_LIST.sub('IN (...)', statement)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    __slots__ = ('count', 'total_time', 'slowest_time', 'slowest_statement', 'statements', 'budget')
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Counter = Counter()
+        self.budget: Optional[int] = None
+
+    def header(self) -> str:
+        header = f"count={self.count}; time={self.total_time * 1000:.1f}ms; slowest={self.slowest_time * 1000:.1f}ms"
+        return header if self.budget is None else f"{header}; budget={self.budget}"
+
+
+# Statistics of the current request, None outside of requests
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar('query_stats', default=None)
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def start() -> contextvars.Token:
+    return _current.set(QueryStats())
+
+
+def finish(token: contextvars.Token, method: str, route: str):
+    stats = _current.get()
+    _current.reset(token)
+    if stats is None or not stats.statements:
+        return
+    statement, repeats = stats.statements.most_common(1)[0]
+    if repeats >= config.DB_N_PLUS_ONE_THRESHOLD:
+        log.warning("Possible N+1 in %s %s: %d executions of %s", method, route, repeats, statement)
+
+
+def instrument_engine(engine: AsyncEngine):
+    event.listen(engine.sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine.sync_engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the statement's own execution context, so one that raises takes its start time with it
+    if context is not None:
+        context.query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'query_stats_start', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    slow = duration * 1000 >= config.DB_SLOW_QUERY_MS
+    stats = _current.get()
+    if stats is None and not slow:
+        return
+
+    normalized = normalize_statement(statement)
+    if slow:
+        log.warning("Slow query (%.1f ms): %s", duration * 1000, normalized)
+    if stats is not None:
+        stats.count += 1
+        stats.total_time += duration
+        stats.statements[normalized] += 1
+        if duration > stats.slowest_time:
+            stats.slowest_time = duration
+            stats.slowest_statement = normalized
+
+
+def query_budget(limit: int):
+    """Declares how many statements a request to the decorated endpoint may run.
+
+    Statements of the whole request count, including the session check. Going
+    over is logged, or raises QueryBudgetExceeded when DB_QUERY_BUDGET_ENFORCE is
+    set, which is how tests catch regressions.
+    """
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            stats = _current.get()
+            if stats is not None:
+                stats.budget = limit
+            response = await endpoint(*args, **kwargs)
+            if stats is not None and stats.count > limit:
+                message = (f"{endpoint.__qualname__} ran {stats.count} queries, budget is {limit}: "
+                           f"{', '.join(stats.statements)}")
+                if config.DB_QUERY_BUDGET_ENFORCE:
+                    raise QueryBudgetExceeded(message)
+                log.warning("Query budget exceeded: %s", message)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,158 @@
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+from aioredis import Redis
+from cachetools import TTLCache
+from config import config
+from ..models import Roles
+from .logger import log
+
+Principal = Tuple[int, List[Roles]]
+
+
+class SessionCache:
+    """Two-tier token -> (user_id, roles) cache.
+
+    The local tier is a per-worker LRU with a short TTL, the Redis tier is shared
+    between workers. Invalidations are published on a Redis channel so every
+    worker drops its local copy as well.
+    """
+    KEY_PREFIX = 'session_principal:'
+    USER_KEY_PREFIX = 'session_principal_user:'
+    CHANNEL = 'session_principal_invalidate'
+
+    def __init__(self, maxsize: int, local_ttl: int, redis_ttl: int):
+        self._local = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        self._redis_ttl = redis_ttl
+        self._redis: Optional[Redis] = None
+        self._listener: Optional[asyncio.Task] = None
+        # Bumped on every invalidation so a lookup racing a role change does not
+        # write the stale principal back into the cache.
+        self._generation = 0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def bind(self, redis: Redis):
+        self._redis = redis
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.local_hits + self.redis_hits) / lookups if lookups else 0,
+            "local_size": len(self._local),
+        }
+
+    async def get(self, token: str) -> Optional[Principal]:
+        principal = self._local.get(token)
+        if principal is not None:
+            self.local_hits += 1
+            return principal
+
+        if self._redis is not None:
+            try:
+                cached = await self._redis.get(f'{self.KEY_PREFIX}{token}')
+            except Exception as e:
+                log.error("Session cache lookup failed: %s", e)
+                cached = None
+            if cached:
+                data = json.loads(cached)
+                principal = (data['user_id'], [Roles(role) for role in data['roles']])
+                self._local[token] = principal
+                self.redis_hits += 1
+                return principal
+
+        self.misses += 1
+        return None
+
+    async def set(self, token: str, user_id: int, roles: List[Roles], generation: int):
+        if generation != self._generation:
+            return
+        self._local[token] = (user_id, list(roles))
+
+        if self._redis is None:
+            return
+        try:
+            user_key = f'{self.USER_KEY_PREFIX}{user_id}'
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.setex(
+                    f'{self.KEY_PREFIX}{token}',
+                    self._redis_ttl,
+                    json.dumps({'user_id': user_id, 'roles': [role.value for role in roles]}))
+                pipe.sadd(user_key, token)
+                pipe.expire(user_key, self._redis_ttl)
+                await pipe.execute()
+        except Exception as e:
+            log.error("Session cache store failed: %s", e)
+
+    async def invalidate_token(self, token: str):
+        self._evict_local(f'token:{token}')
+        if self._redis is None:
+            return
+        try:
+            await self._redis.delete(f'{self.KEY_PREFIX}{token}')
+            await self._redis.publish(self.CHANNEL, f'token:{token}')
+        except Exception as e:
+            log.error("Session cache invalidation failed for token: %s", e)
+
+    async def invalidate_user(self, user_id: int):
+        self._evict_local(f'user:{user_id}')
+        if self._redis is None:
+            return
+        try:
+            user_key = f'{self.USER_KEY_PREFIX}{user_id}'
+            tokens = await self._redis.smembers(user_key)
+            await self._redis.delete(user_key, *(f'{self.KEY_PREFIX}{token}' for token in tokens))
+            await self._redis.publish(self.CHANNEL, f'user:{user_id}')
+        except Exception as e:
+            log.error("Session cache invalidation failed for user %s: %s", user_id, e)
+
+    def _evict_local(self, message: str):
+        self._generation += 1
+        kind, _, value = message.partition(':')
+        if kind == 'token':
+            self._local.pop(value, None)
+        elif kind == 'user':
+            user_id = int(value)
+            for token, (cached_user_id, _) in list(self._local.items()):
+                if cached_user_id == user_id:
+                    self._local.pop(token, None)
+
+    async def start(self):
+        if self._redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(self.CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self._evict_local(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("Session cache listener failed: %s", e)
+                # Entries written while we were deaf may be stale
+                self._local.clear()
+                await asyncio.sleep(1)
+
+
+session_cache = SessionCache(
+    maxsize=config.SESSION_CACHE_SIZE,
+    local_ttl=config.SESSION_CACHE_LOCAL_TTL,
+    redis_ttl=config.SESSION_CACHE_REDIS_TTL)
@@ -0,0 +1,52 @@
+from typing import Any, AsyncIterable, Dict, Iterable, Optional, Union
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from .encoding import dumps
+
+NDJSON = 'application/x-ndjson'
+
+# Records are flushed in groups, one send per record costs more than the encoding
+CHUNK_RECORDS = 256
+
+Records = Union[Iterable[Any], AsyncIterable[Any]]
+
+
+def wants_stream(request: Request) -> bool:
+    """Streaming is asked for with `Accept: application/x-ndjson` or `?stream=1`."""
+    if request.query_params.get('stream', '').lower() in ('1', 'true'):
+        return True
+    return NDJSON in request.headers.get('accept', '')
+
+
+def encode_record(record: Any) -> bytes:
+    if isinstance(record, bytes):
+        return record
+    return dumps(record)
+
+
+async def _ndjson_chunks(records: Records):
+    chunk = []
+    if hasattr(records, '__aiter__'):
+        async for record in records:
+            chunk.append(encode_record(record))
+            if len(chunk) >= CHUNK_RECORDS:
+                yield b'\n'.join(chunk) + b'\n'
+                chunk = []
+    else:
+        for record in records:
+            chunk.append(encode_record(record))
+            if len(chunk) >= CHUNK_RECORDS:
+                yield b'\n'.join(chunk) + b'\n'
+                chunk = []
+    if chunk:
+        yield b'\n'.join(chunk) + b'\n'
+
+
+def ndjson_response(records: Records, headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """One JSON document per line, encoded as the records are produced.
+
+    Records may already be encoded (bytes). List metadata such as totals goes
+    into `headers`, since there is no envelope to carry it.
+    """
+    return StreamingResponse(_ndjson_chunks(records), media_type=NDJSON, headers=headers)
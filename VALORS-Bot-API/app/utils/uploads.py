@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import UploadFile
+from config import config
+from .logger import log
+
+CHUNK_SIZE = 64 * 1024
+# Staged files not yet promoted, named so they are never served as content
+TEMP_PREFIX = '.upload-'
+TEMP_SUFFIX = '.part'
+
+# File IO of uploads, kept off the default executor so a burst of them cannot starve other work
+_executor = ThreadPoolExecutor(max_workers=config.UPLOAD_WORKERS, thread_name_prefix='uploads')
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class StagedUpload:
+    """An upload written to a temporary file next to its final, content-addressed name.
+
+    Nothing references the temporary file, so it can be dropped at any point until
+    promote() moves it into place. Call promote() only once whatever points at
+    `filename` has been committed, and discard() on every other path.
+    """
+
+    def __init__(self, directory: str, temp_path: str, extension: str):
+        self.directory = directory
+        self.temp_path: Optional[str] = temp_path
+        self.extension = extension
+        self.digest: Optional[str] = None
+        self.size = 0
+
+    @property
+    def filename(self) -> str:
+        return f"{self.digest}{self.extension}"
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.filename)
+
+    async def promote(self) -> str:
+        """Moves the upload to its content-addressed path, returning that path."""
+        if self.temp_path:
+            await run_file_io(_promote, self.temp_path, self.path)
+            self.temp_path = None
+        return self.path
+
+    async def discard(self):
+        if self.temp_path:
+            temp_path, self.temp_path = self.temp_path, None
+            try:
+                await run_file_io(_remove, temp_path)
+            except OSError as e:
+                log.error("Removing staged upload %s failed: %s", temp_path, e)
+
+
+async def stage_upload(upload: UploadFile, directory: str, max_bytes: int) -> StagedUpload:
+    """Streams `upload` into `directory`, hashing it on the way.
+
+    Raises UploadTooLarge as soon as more than `max_bytes` have been copied, and
+    ValueError for an empty upload. Nothing is left behind when it raises. By
+    then Starlette has spooled the request body already, the cap here keeps
+    oversized files out of the upload directory; UploadLimitMiddleware is what
+    stops the body from being read at all.
+    """
+    extension = os.path.splitext(upload.filename or '')[1].lower()
+    fd, temp_path = await run_file_io(_create_temp, directory)
+    staged = StagedUpload(directory, temp_path, extension)
+    hasher = hashlib.sha256()
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                staged.size += len(chunk)
+                if staged.size > max_bytes:
+                    raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+                await run_file_io(_write_chunk, out, hasher, chunk)
+        if not staged.size:
+            raise ValueError("Upload is empty")
+    except BaseException:
+        await staged.discard()
+        raise
+    staged.digest = hasher.hexdigest()
+    return staged
+
+
+def run_file_io(fn, *args):
+    return asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+def _create_temp(directory: str):
+    # In the upload directory itself so promoting is an atomic rename
+    os.makedirs(directory, exist_ok=True)
+    return tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=TEMP_SUFFIX, dir=directory)
+
+
+def _write_chunk(out, hasher, chunk: bytes):
+    # hashlib releases the GIL on chunks this size
+    hasher.update(chunk)
+    out.write(chunk)
+
+
+def _promote(temp_path: str, path: str):
+    if os.path.exists(path):
+        # Same name, same content: written by an earlier upload
+        os.remove(temp_path)
+    else:
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,322 @@
+"""Seeded synthetic guild and league data, from a thousand to a million users.
+
+Every league user is a guild member. The Discord side (gateway members for the
+client, REST members for benchmarks.fake_discord) is derived from the same seed
+as the rows, so ids, names and ranks line up across the stand-ins. Rows are
+generated lazily per table and loaded with COPY, a million users load in well
+under a minute instead of hours of INSERTs.
+
+Run from VALORS-Bot-API/ to fill a database you can point the API at:
+    python -m benchmarks.datagen --database-url postgresql+asyncpg://... [--users N] [--teams N]
+        [--members-out members.json]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks.members import synthetic_guild
+from benchmarks.search import SYLLABLES
+
+import asyncpg
+from sqlalchemy import BigInteger, Column, MetaData, String, Table
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import config
+from app.models import (
+    Base, BotSettings, MMBotRanks, MMBotUserSummaryStats, MMBotUsers,
+    Roles, Sessions, TeamCaptains, TeamJoinRequests, TeamUsers, Teams, UserRoles, Users
+)
+
+TEAM_SIZE = 5
+RANK_COUNT = 10
+FIRST_MEMBER_ID = 10**17
+COLORS = ['#e74c3c', '#3498db', '#2ecc71', '#f1c40f', '#9b59b6', '#1abc9c', '#34495e', '#ecf0f1']
+
+Rows = Tuple[Table, List[str], Iterator[tuple]]
+
+
+class SyntheticGuild:
+    """The parts of nextcord.Guild the API reads."""
+    def __init__(self, guild_id: int, members: list):
+        self.id = guild_id
+        self.members = members
+        self._members = {member.id: member for member in members}
+        self._roles = {role.id: role for member in members for role in member.roles}
+
+    def get_member(self, member_id: int):
+        return self._members.get(member_id)
+
+    def get_role(self, role_id: int):
+        return self._roles.get(role_id)
+
+
+class Dataset:
+    """Volumes and seed of one synthetic deployment; rows are produced on demand.
+
+    Each table draws from its own generator seeded from `seed`, so the rows of
+    one table do not change when the volume of another does.
+    """
+    def __init__(
+        self,
+        users: int,
+        teams: Optional[int] = None,
+        join_requests: Optional[int] = None,
+        sessions: Optional[int] = None,
+        player_ratio: float = 0.6,
+        seed: int = 1,
+        guild_id: int = config.DISCORD_GUILD_ID
+    ):
+        self.users = users
+        self.teams = min(users // 10 if teams is None else teams, users // TEAM_SIZE)
+        self.join_requests = self.teams * 2 if join_requests is None else join_requests
+        self.sessions = min(users, users // 4 + 1 if sessions is None else sessions)
+        self.admins = users // 1000 + 1
+        self.player_ratio = player_ratio
+        self.seed = seed
+        self.guild_id = guild_id
+        self.now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self._usernames: Optional[List[str]] = None
+
+    def _rng(self, table: str) -> random.Random:
+        return random.Random(f'{self.seed}:{table}')
+
+    @property
+    def discord_ids(self) -> range:
+        return range(FIRST_MEMBER_ID, FIRST_MEMBER_ID + self.users)
+
+    @property
+    def usernames(self) -> List[str]:
+        if self._usernames is None:
+            self._usernames = self._generate_usernames()
+        return self._usernames
+
+    def _generate_usernames(self) -> List[str]:
+        # One draw per user, names that are taken get a number, like gamer tags do
+        rng = self._rng('usernames')
+        seen = set()
+        usernames = []
+        for index in range(self.users):
+            name = ''.join(rng.choices(SYLLABLES, k=2 + int(rng.random() * 3)))
+            if name in seen or rng.random() < 0.2:
+                name = f'{name}{index}'
+            seen.add(name)
+            usernames.append(name)
+        return usernames
+
+    @property
+    def team_ids(self) -> range:
+        return range(1, self.teams + 1)
+
+    @staticmethod
+    def session_token(user_id: int) -> str:
+        return f'bench-session-{user_id}'
+
+    @property
+    def admin_session(self) -> str:
+        # User 1 is an administrator and always has a session
+        return self.session_token(1)
+
+    def guild(self) -> SyntheticGuild:
+        """Gateway-shaped members, as the client would hold them once ready."""
+        members, _ = synthetic_guild(self.users, RANK_COUNT, self._rng('guild'))
+        return SyntheticGuild(self.guild_id, members)
+
+    def rest_members(self, guild: Optional[SyntheticGuild] = None) -> List[dict]:
+        """The guild as the Discord REST stand-in serves it."""
+        guild = guild or self.guild()
+        return [{
+            "user": {"id": str(member.id), "username": member.name, "avatar": None},
+            "nick": member.nick,
+            "roles": [str(role.id) for role in member.roles[1:]],
+        } for member in guild.members]
+
+    def thresholds(self) -> list:
+        return synthetic_guild(0, RANK_COUNT, self._rng('guild'))[1]
+
+    def players(self) -> Iterator[int]:
+        rng = self._rng('players')
+        return (discord_id for discord_id in self.discord_ids if rng.random() < self.player_ratio)
+
+    def tables(self) -> Iterator[Rows]:
+        """(table, columns, rows) in foreign key order."""
+        yield BotSettings.__table__, ['guild_id'], iter([(self.guild_id,)])
+        yield MMBotRanks.__table__, ['guild_id', 'mmr_threshold', 'role_id'], (
+            (self.guild_id, rank.mmr_threshold, rank.role_id) for rank in self.thresholds())
+        yield MMBotUsers.__table__, ['guild_id', 'user_id', 'display_name'], (
+            (self.guild_id, discord_id, f'user{discord_id - FIRST_MEMBER_ID}') for discord_id in self.players())
+        yield MMBotUserSummaryStats.__table__, [
+            'guild_id', 'user_id', 'mmr', 'momentum', 'games', 'wins', 'losses', 'ct_starts',
+            'top_score', 'top_kills', 'top_assists', 'total_score', 'total_kills', 'total_deaths', 'total_assists',
+        ], self._summary_stats()
+        yield Users.__table__, ['id', 'discord_id', 'email', 'username', 'is_active'], self._users()
+        yield UserRoles.__table__, ['user_id', 'role'], self._user_roles()
+        yield Sessions.__table__, ['user_id', 'session_token', 'ip_address', 'user_agent', 'last_activity'], (
+            (user_id, self.session_token(user_id), '127.0.0.1', 'bench', self.now)
+            for user_id in range(1, self.sessions + 1))
+        yield Teams.__table__, [
+            'id', 'name', 'bio', 'color1', 'color2', 'verified', 'timestamp', 'disbanded_at',
+        ], self._teams()
+        yield TeamUsers.__table__, ['team_id', 'user_id', 'timestamp'], (
+            (team_id, (team_id - 1) * TEAM_SIZE + offset, self.now - timedelta(minutes=offset))
+            for team_id in self.team_ids for offset in range(1, TEAM_SIZE + 1))
+        yield TeamCaptains.__table__, ['team_id', 'user_id'], (
+            (team_id, (team_id - 1) * TEAM_SIZE + 1) for team_id in self.team_ids)
+        yield TeamJoinRequests.__table__, ['team_id', 'user_id'], self._join_requests()
+
+    def _summary_stats(self) -> Iterator[tuple]:
+        rng = self._rng('summary_stats')
+        draw = rng.random
+        for discord_id in self.players():
+            games = 1 + int(draw() * 400)
+            wins = int(draw() * (games + 1))
+            kills, deaths = 5 + int(draw() * 21), 5 + int(draw() * 21)
+            assists, score = int(draw() * 11), 100 + int(draw() * 251)
+            yield (self.guild_id, discord_id, round(rng.gauss(1000, 250), 2), 1.0, games, wins, games - wins,
+                   int(draw() * (games + 1)), score * 2, kills * 2, assists * 2,
+                   score * games, kills * games, deaths * games, assists * games)
+
+    def _users(self) -> Iterator[tuple]:
+        rng = self._rng('users')
+        for user_id, (discord_id, username) in enumerate(zip(self.discord_ids, self.usernames), start=1):
+            active = user_id <= self.admins or rng.random() > 0.02
+            yield user_id, str(discord_id), f'{username}@bench.invalid', username, active
+
+    def _user_roles(self) -> Iterator[tuple]:
+        # Enums are stored by name
+        rng = self._rng('user_roles')
+        for user_id in range(1, self.users + 1):
+            yield user_id, Roles.USER.name
+            if user_id <= self.admins:
+                yield user_id, Roles.ADMIN.name
+            elif rng.random() < 0.01:
+                yield user_id, Roles.MOD.name
+
+    def _teams(self) -> Iterator[tuple]:
+        rng = self._rng('teams')
+        for team_id in self.team_ids:
+            disbanded = rng.random() < 0.1
+            yield (team_id, f'{self.usernames[team_id - 1]} esports', 'Synthetic team',
+                   rng.choice(COLORS), rng.choice(COLORS), rng.random() < 0.3,
+                   self.now - timedelta(days=rng.randint(1, 700)), self.now if disbanded else None)
+
+    def _join_requests(self) -> Iterator[tuple]:
+        if not self.teams:
+            return
+        rng = self._rng('join_requests')
+        for _ in range(self.join_requests):
+            yield rng.randint(1, self.teams), rng.randint(1, self.users)
+
+
+def _schema() -> MetaData:
+    """Copies of the app's tables plus the bot's tables they reference, to create the schema from.
+
+    A metadata of its own, so importing the benchmarks leaves the app's untouched.
+    """
+    metadata = MetaData()
+    # Owned by the matchmaking bot, only here so the bot tables' foreign keys resolve
+    Table(
+        'bot_regions', metadata,
+        Column('guild_id', BigInteger, primary_key=True),
+        Column('label', String(32), primary_key=True))
+    for table in Base.metadata.tables.values():
+        if table.key not in metadata.tables:
+            table.to_metadata(metadata)
+    return metadata
+
+
+def _trigram_indexes() -> list:
+    return [index for table in (Users.__table__, Teams.__table__)
+            for index in table.indexes if index.name.endswith('_trgm')]
+
+
+# Unique and foreign key constraints, foreign keys first so they go before what they reference
+_CONSTRAINTS = """
+    SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+    FROM pg_constraint
+    WHERE contype IN ('f', 'u') AND connamespace IN ('public'::regnamespace, 'valors_league'::regnamespace)
+    ORDER BY contype
+"""
+
+
+async def load(database_url: str, dataset: Dataset) -> Dict[str, Any]:
+    """Creates the schema in an empty database and COPYs `dataset` into it.
+
+    Unique and foreign key constraints and the trigram indexes are only added
+    once the rows are in: building an index or validating a key in one pass is
+    far cheaper than maintaining it row by row.
+    """
+    url = make_url(database_url)
+    engine = create_async_engine(url)
+    trigram_indexes = _trigram_indexes()
+    try:
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql('CREATE SCHEMA IF NOT EXISTS valors_league')
+            await conn.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            await conn.run_sync(_schema().create_all)
+            for index in trigram_indexes:
+                await conn.exec_driver_sql(f'DROP INDEX valors_league.{index.name}')
+            constraints = (await conn.exec_driver_sql(_CONSTRAINTS)).all()
+            for table, name, _ in constraints:
+                await conn.exec_driver_sql(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+
+        tables: Dict[str, Any] = {}
+        conn = await asyncpg.connect(url.set(drivername='postgresql').render_as_string(hide_password=False))
+        try:
+            for table, columns, rows in dataset.tables():
+                start = time.perf_counter()
+                status = await conn.copy_records_to_table(
+                    table.name, schema_name=table.schema or 'public', columns=columns, records=rows)
+                tables[table.name] = {
+                    "rows": int(status.split()[-1]),
+                    "seconds": round(time.perf_counter() - start, 3),
+                }
+        finally:
+            await conn.close()
+
+        start = time.perf_counter()
+        async with engine.begin() as conn:
+            for table, name, definition in reversed(constraints):
+                await conn.exec_driver_sql(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
+            for index in trigram_indexes:
+                await conn.run_sync(index.create)
+            # Explicit ids leave the sequences behind, later inserts would collide
+            for table in (Users.__table__, Teams.__table__):
+                await conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table.fullname}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {table.fullname}))")
+            await conn.exec_driver_sql('ANALYZE')
+        tables["constraints_and_indexes"] = {"seconds": round(time.perf_counter() - start, 3)}
+        return tables
+    finally:
+        await engine.dispose()
+
+
+async def main(database_url: str, dataset: Dataset, members_out: Optional[str]) -> dict:
+    start = time.perf_counter()
+    tables = await load(database_url, dataset)
+    result = {"users": dataset.users, "teams": dataset.teams, "tables": tables,
+              "seconds": round(time.perf_counter() - start, 3)}
+    if members_out:
+        with open(members_out, 'w') as f:
+            json.dump(dataset.rest_members(), f)
+        result["members_out"] = members_out
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True, help="An empty database, the schema is created in it")
+    parser.add_argument('--users', type=int, default=10_000, help="League users, every one a guild member")
+    parser.add_argument('--teams', type=int, default=None, help="Defaults to one team per ten users")
+    parser.add_argument('--join-requests', type=int, default=None, help="Defaults to two per team")
+    parser.add_argument('--sessions', type=int, default=None, help="Defaults to a quarter of the users")
+    parser.add_argument('--members-out', default=None, help="Writes the REST guild member list as JSON")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    dataset = Dataset(args.users, args.teams, args.join_requests, args.sessions, seed=args.seed)
+    print(json.dumps(asyncio.run(main(args.database_url, dataset, args.members_out)), indent=2))
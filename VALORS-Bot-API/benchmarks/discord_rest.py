@@ -0,0 +1,74 @@
+"""Exercises the shared Discord REST client against the local fake Discord.
+
+Fires bursts larger than the fake's rate limit and checks that every request
+eventually succeeds by queueing on its bucket instead of failing.
+
+Run from VALORS-Bot-API/:  python -m benchmarks.discord_rest [--burst N] [--rate-limit R]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.utils import serve
+
+from app.utils.discord_rest import DiscordREST
+from benchmarks.fake_discord import create_fake_discord
+
+GUILD_ID = 1
+
+
+def synthetic_members(count: int):
+    return [
+        {"user": {"id": str(10**17 + i), "username": f"member{i}", "avatar": None}, "nick": None, "roles": []}
+        for i in range(count)]
+
+
+async def run(burst: int, rate_limit: int, window: float, members: int) -> dict:
+    fake = create_fake_discord(members=synthetic_members(members), rate_limit=rate_limit, window=window)
+    async with serve(fake) as base_url:
+        rest = DiscordREST(base_url, 'bench-token')
+        try:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                rest.request('PUT', f'/guilds/{GUILD_ID}/members/{10**17 + i}/roles/{10**17}')
+                for i in range(burst)))
+            burst_elapsed = time.perf_counter() - start
+            statuses = sorted({response.status_code for response in responses})
+
+            start = time.perf_counter()
+            fetched, after = 0, '0'
+            while True:
+                response = await rest.request('GET', f'/guilds/{GUILD_ID}/members', params={'limit': 1000, 'after': after})
+                page = response.json()
+                fetched += len(page)
+                if len(page) < 1000:
+                    break
+                after = page[-1]['user']['id']
+            paging_elapsed = time.perf_counter() - start
+        finally:
+            await rest.close()
+
+    return {
+        "burst": {
+            "requests": burst,
+            "statuses": statuses,
+            "elapsed_s": burst_elapsed,
+            # Ideal is ceil(burst / rate_limit) - 1 windows
+            "minimum_s": max(0, -(-burst // rate_limit) - 1) * window,
+        },
+        "member_paging": {"members": fetched, "elapsed_s": paging_elapsed},
+        "client_requests": rest.requests,
+        "client_429s": rest.rate_limited,
+        "server_rejections": fake.state.limiter.rejected,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--burst', type=int, default=120)
+    parser.add_argument('--rate-limit', type=int, default=10)
+    parser.add_argument('--window', type=float, default=0.5)
+    parser.add_argument('--members', type=int, default=5000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.burst, args.rate_limit, args.window, args.members)), indent=2))
@@ -0,0 +1,91 @@
+"""Encode time of leaderboard and member payloads: stdlib JSONResponse versus orjson.
+
+Run from VALORS-Bot-API/:  python -m benchmarks.encoding [--rows N] [--members N] [--rounds R]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from benchmarks.members import process_member, synthetic_guild
+from benchmarks.utils import percentile
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.encoding import FastJSONResponse
+
+
+def leaderboard_payload(rows: int, rng: random.Random):
+    return [{
+        'username': f'player{i}',
+        'mmr': 2500 - i,
+        'games': (games := rng.randint(1, 400)),
+        'wins': (wins := rng.randint(0, games)),
+        'win_rate': wins / games,
+        'avg_kills': rng.uniform(5, 25),
+        'avg_deaths': rng.uniform(5, 25),
+        'avg_assists': rng.uniform(0, 10),
+        'avg_score': rng.uniform(100, 350),
+        'rank': i + 1,
+        'mm_rank': {'name': 'Gold', 'color': '#f1c40f', 'url': None},
+    } for i in range(rows)]
+
+
+def team_payload(rows: int):
+    now = datetime.now(timezone.utc)
+    return {'teams': [{
+        'id': i, 'name': f'team{i}', 'bio': 'bio', 'color1': '#000000', 'color2': '#ffffff',
+        'logo_url': None, 'display_trophy': False, 'timestamp': now, 'disbanded_at': None,
+    } for i in range(rows)]}
+
+
+def timed(encode, rounds: int) -> dict:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        encode()
+        samples.append(time.perf_counter() - start)
+    return {"p50_ms": percentile(samples, 50) * 1000, "max_ms": max(samples) * 1000}
+
+
+def compare(payload, rounds: int, through_encoder: bool = False) -> dict:
+    # Plain route returns and response models also pass through jsonable_encoder first
+    legacy = (lambda: JSONResponse(jsonable_encoder(payload))) if through_encoder else (lambda: JSONResponse(payload))
+    assert json.loads(legacy().body) == json.loads(FastJSONResponse(payload).body)
+    return {
+        "stdlib": timed(legacy, rounds),
+        "orjson": timed(lambda: FastJSONResponse(payload), rounds),
+    }
+
+
+def run(rows: int, member_count: int, rounds: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    members, ranks = synthetic_guild(member_count, 10, rng)
+    member_payload = {
+        'members': [process_member(member, ranks) for member in members],
+        'total_members': member_count,
+    }
+    team_rows = team_payload(rows)
+    return {
+        "leaderboard_rows": rows,
+        "leaderboard": compare(leaderboard_payload(rows, rng), rounds),
+        "leaderboard_plain_return": compare(leaderboard_payload(rows, rng), rounds, through_encoder=True),
+        "members": member_count,
+        "members_response_model": compare(jsonable_encoder(member_payload), rounds, through_encoder=True),
+        # stdlib needs the timestamps converted by hand, orjson takes datetimes as they are
+        "teams_isoformat": timed(lambda: JSONResponse({'teams': [
+            {**team, 'timestamp': team['timestamp'].isoformat()} for team in team_rows['teams']]}), rounds),
+        "teams_orjson": timed(lambda: FastJSONResponse(team_rows), rounds),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5_000)
+    parser.add_argument('--members', type=int, default=10_000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.members, args.rounds, args.seed), indent=2))
@@ -0,0 +1,113 @@
+"""Minimal stand-in for the Discord REST API, with Discord-style rate limit headers."""
+import asyncio
+import bisect
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response
+
+
+class FakeRateLimiter:
+    """Fixed-window limiter per bucket, answering like Discord does."""
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.windows: Dict[str, Tuple[float, int]] = {}
+        self.rejected = 0
+
+    def check(self, bucket: str) -> Optional[JSONResponse]:
+        now = time.monotonic()
+        started, used = self.windows.get(bucket, (now, 0))
+        if now - started >= self.window:
+            started, used = now, 0
+        reset_after = self.window - (now - started)
+        if used >= self.limit:
+            self.rejected += 1
+            return JSONResponse(
+                status_code=429,
+                content={"message": "You are being rate limited.", "retry_after": reset_after, "global": False},
+                headers=self.headers(bucket, 0, reset_after))
+        self.windows[bucket] = (started, used + 1)
+        return None
+
+    def headers(self, bucket: str, remaining: int, reset_after: float) -> Dict[str, str]:
+        return {
+            'X-RateLimit-Bucket': bucket,
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+        }
+
+    def decorate(self, bucket: str, response: Response) -> Response:
+        started, used = self.windows[bucket]
+        reset_after = max(0.0, self.window - (time.monotonic() - started))
+        response.headers.update(self.headers(bucket, self.limit - used, reset_after))
+        return response
+
+
+def synthetic_commands(count: int = 10) -> List[dict]:
+    return [{"id": str(900000 + i), "name": f"command{i}", "description": f"Command {i}", "type": 1} for i in range(count)]
+
+
+def create_fake_discord(
+    members: Optional[List[dict]] = None,
+    commands: Optional[List[dict]] = None,
+    rate_limit: int = 50,
+    window: float = 1.0,
+    latency: float = 0.0
+) -> FastAPI:
+    """`members` are REST-shaped guild members ({'user': {...}, 'nick': ...}), sorted by user id."""
+    app = FastAPI()
+    app.state.limiter = limiter = FakeRateLimiter(rate_limit, window)
+    app.state.requests = 0
+    members = sorted(members or [], key=lambda member: int(member['user']['id']))
+    member_ids = [int(member['user']['id']) for member in members]
+    commands = commands if commands is not None else synthetic_commands()
+
+    async def limited(bucket: str, build):
+        app.state.requests += 1
+        if latency:
+            await asyncio.sleep(latency)
+        rejected = limiter.check(bucket)
+        if rejected:
+            return rejected
+        return limiter.decorate(bucket, build())
+
+    @app.get("/applications/{application_id}/commands")
+    async def global_commands(request: Request, application_id: int):
+        return await limited('commands', lambda: JSONResponse(content=commands[: len(commands) // 2]))
+
+    @app.get("/applications/{application_id}/guilds/{guild_id}/commands")
+    async def guild_commands(request: Request, application_id: int, guild_id: int):
+        return await limited(f'guild-commands-{guild_id}', lambda: JSONResponse(content=commands[len(commands) // 2:]))
+
+    @app.get("/guilds/{guild_id}/members")
+    async def list_members(
+        request: Request,
+        guild_id: int,
+        limit: int = Query(1, ge=1, le=1000),
+        after: int = Query(0)
+    ):
+        def build():
+            start = bisect.bisect_right(member_ids, after)
+            page = members[start:start + limit]
+            return JSONResponse(content=page)
+        return await limited(f'members-{guild_id}', build)
+
+    @app.put("/guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+    async def add_role(request: Request, guild_id: int, user_id: int, role_id: int):
+        return await limited(f'member-roles-{guild_id}', lambda: Response(status_code=204))
+
+    @app.get("/users/@me")
+    async def me(request: Request):
+        token = request.headers.get('Authorization', '').split(' ')[-1]
+        return await limited(f'me-{token}', lambda: JSONResponse(content={
+            "id": "100000000000000001", "username": "bench", "email": "bench@bench.invalid"}))
+
+    @app.get("/users/{user_id}")
+    async def user(request: Request, user_id: int):
+        return await limited('users', lambda: JSONResponse(content={
+            "id": str(user_id), "username": f"user{user_id}", "avatar": None, "discriminator": "0"}))
+
+    return app
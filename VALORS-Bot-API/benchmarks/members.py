@@ -0,0 +1,131 @@
+"""Builds the /guild/members body per request versus slicing the member snapshot.
+
+Run from VALORS-Bot-API/:  python -m benchmarks.members [--members N] [--rounds R]
+"""
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+from benchmarks.utils import percentile
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from app.services.members import MemberSnapshot
+from app.services.ranks import RankIndex
+from app.utils.utils import resize_image_url
+
+
+# The per-request path as it was before the snapshot, kept here as the baseline
+class MemberRank(BaseModel):
+    name: str
+    color: str
+    url: Optional[str]
+
+
+class Member(BaseModel):
+    id: str
+    username: str
+    nick: Optional[str]
+    name: str
+    discriminator: str
+    avatar_url: str
+    status: str
+    roles: List[str]
+    mm_rank: Optional[MemberRank]
+    is_bot: bool
+
+
+class MembersResponse(BaseModel):
+    members: List[Member]
+    total_members: int
+
+
+def process_member(member, ranks):
+    rank = next((role for role in member.roles if role.id in (r.role_id for r in ranks)), None)
+    return Member(
+        id=str(member.id),
+        username=member.name,
+        nick=member.nick,
+        name=member.display_name,
+        discriminator=member.discriminator,
+        avatar_url=resize_image_url(member.display_avatar.url, 64).replace('.png', '.webp'),
+        status=str(member.status),
+        roles=[role.name for role in member.roles[1:]],
+        mm_rank=MemberRank(
+            name=rank.name,
+            color=f'{rank.color}',
+            url=resize_image_url(rank.icon.url, 24) if rank.icon else None
+        ) if rank else None,
+        is_bot=member.bot
+    )
+
+
+def legacy_body(members, ranks) -> bytes:
+    response = MembersResponse(members=[process_member(member, ranks) for member in members], total_members=len(members))
+    # What FastAPI does with response_model: validate again, then encode
+    validated = MembersResponse.parse_obj(jsonable_encoder(response))
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def synthetic_guild(member_count: int, rank_count: int, rng: random.Random):
+    def role(role_id, name):
+        icon = SimpleNamespace(url=f'https://cdn.discordapp.com/role-icons/{role_id}/icon.png')
+        return SimpleNamespace(id=role_id, name=name, color='#a0a0a0', icon=icon)
+
+    everyone = role(1, '@everyone')
+    ranks = [role(2000 + i, f'Rank {i}') for i in range(rank_count)]
+    thresholds = [SimpleNamespace(role_id=rank.id, mmr_threshold=1000 + 100 * i) for i, rank in enumerate(ranks)]
+    extras = [role(3000 + i, f'Role {i}') for i in range(20)]
+    members = []
+    for i in range(member_count):
+        member_id = 10**17 + i
+        roles = [everyone] + rng.sample(extras, rng.randint(0, 4))
+        if rng.random() < 0.6:
+            roles.append(rng.choice(ranks))
+        members.append(SimpleNamespace(
+            id=member_id, name=f'user{i}', nick=f'nick{i}' if rng.random() < 0.3 else None,
+            display_name=f'user{i}', discriminator='0', bot=False, status='online', roles=roles,
+            display_avatar=SimpleNamespace(url=f'https://cdn.discordapp.com/avatars/{member_id}/a.png?size=1024')))
+    return members, thresholds
+
+
+def timed(build, rounds: int) -> dict:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        build()
+        samples.append(time.perf_counter() - start)
+    return {"p50_ms": percentile(samples, 50) * 1000, "max_ms": max(samples) * 1000}
+
+
+def run(member_count: int, rank_count: int, rounds: int, seed: int) -> dict:
+    members, ranks = synthetic_guild(member_count, rank_count, random.Random(seed))
+    rank_index = RankIndex(guild_id=1, ttl=float('inf'))
+    rank_index.replace((rank.mmr_threshold, rank.role_id) for rank in ranks)
+    snapshot = MemberSnapshot(rank_index)
+    start = time.perf_counter()
+    snapshot.rebuild(members)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    assert json.loads(snapshot.render()) == json.loads(legacy_body(members, ranks))
+    return {
+        "members": member_count,
+        "legacy_full": timed(lambda: legacy_body(members, ranks), rounds),
+        "snapshot_full": timed(snapshot.render, rounds),
+        "snapshot_page_50": timed(lambda: snapshot.render(5000 % member_count, 50), rounds),
+        "snapshot_build_ms": build_ms,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--members', type=int, default=10_000)
+    parser.add_argument('--ranks', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(run(args.members, args.ranks, args.rounds, args.seed), indent=2))
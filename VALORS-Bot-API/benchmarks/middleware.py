@@ -0,0 +1,141 @@
+"""Compares the request pipeline against the former BaseHTTPMiddleware stack.
+
+Run from VALORS-Bot-API/:  python -m benchmarks.middleware [--requests N] [--concurrency C]
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import re
+
+from benchmarks.utils import drive
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from config import config
+from app.middleware import RequestPipelineMiddleware, RouteTable
+from app.models import Roles
+from app.utils.session_cache import session_cache
+
+TOKEN = 'bench-session'
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+# The stack as it was before the pipeline, kept here as the baseline
+class LegacyDBSessionMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        async with request.app.state.AsyncSessionLocal() as session:
+            request.state.db = session
+            try:
+                response = await call_next(request)
+                await session.commit()
+                return response
+            except Exception as e:
+                await session.rollback()
+                raise e
+            finally:
+                await session.close()
+
+
+class LegacySessionTokenMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, whitelist_patterns):
+        super().__init__(app)
+        self.whitelist_patterns = [re.compile(pattern) for pattern in whitelist_patterns]
+
+    async def dispatch(self, request: Request, call_next):
+        if any(pattern.match(request.url.path) for pattern in self.whitelist_patterns):
+            token = request.headers.get('session-token', None)
+            if not token:
+                return JSONResponse(status_code=401, content={"error": "Missing User Session token"})
+            # Always warm in the benchmark, both stacks share the session cache
+            request.state.user_id, roles = await session_cache.get(token)
+            request.state.roles = list(roles)
+        return await call_next(request)
+
+
+class LegacyAuthorizationTokenMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, whitelist_patterns):
+        super().__init__(app)
+        self.whitelist_patterns = [re.compile(pattern) for pattern in whitelist_patterns]
+
+    async def dispatch(self, request: Request, call_next):
+        if any(pattern.match(request.url.path) for pattern in self.whitelist_patterns):
+            auth_header = request.headers.get('Authorization')
+            if not auth_header:
+                return JSONResponse(status_code=401, content={"error": "Missing Authorization header"})
+            if not hmac.compare_digest(auth_header, config.API_TOKEN):
+                return JSONResponse(status_code=401, content={"error": "Invalid Authorization token"})
+        return await call_next(request)
+
+
+def build_app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+    app.state.AsyncSessionLocal = FakeSession
+    app.state.ReadOnlySessionLocal = FakeSession
+
+    @app.get("/user/me")
+    async def me(request: Request):
+        return JSONResponse(content={"id": request.state.user_id})
+
+    @app.get("/guild/members")
+    async def members(request: Request):
+        return JSONResponse(content={"members": []})
+
+    @app.get("/data")
+    async def data(request: Request):
+        return JSONResponse(content={"number": 4})
+
+    if legacy:
+        app.add_middleware(LegacyDBSessionMiddleware)
+        app.add_middleware(LegacyAuthorizationTokenMiddleware, whitelist_patterns=[
+            r"^/user", r"^/team", r"^/session", r"^/guild", r"^/matchmaking", r"^/internal"])
+        app.add_middleware(LegacySessionTokenMiddleware, whitelist_patterns=[
+            r"^/user/me", r"^/user/roles", r"^/user/all", r"^/user/\d+", r"^/team/", r"^/session/check"])
+    else:
+        app.add_middleware(RequestPipelineMiddleware, routes=RouteTable(
+            api_token_prefixes=["/user", "/team", "/session", "/guild", "/matchmaking", "/internal"],
+            session_prefixes=["/user/me", "/user/roles", "/user/all", "/team/", "/session/check"],
+            session_id_prefixes=["/user/"]))
+    return app
+
+
+async def run(total: int, concurrency: int) -> dict:
+    await session_cache.set(TOKEN, 1, [Roles.USER], generation=session_cache.generation)
+    headers = {'Authorization': config.API_TOKEN, 'session-token': TOKEN}
+    results = {}
+    for name, legacy in (('legacy', True), ('pipeline', False)):
+        transport = httpx.ASGITransport(app=build_app(legacy))
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            for path in ('/user/me', '/guild/members', '/data'):
+                async def call():
+                    response = await client.get(path, headers=headers)
+                    assert response.status_code == 200, response.text
+                results.setdefault(path, {})[name] = await drive(call, total, concurrency)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency)), indent=2))
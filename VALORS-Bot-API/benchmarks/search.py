@@ -0,0 +1,109 @@
+"""Username search with and without the trigram index over synthetic users.
+
+Everything runs in a scratch schema (`valors_bench` by default) that is dropped
+afterwards, so it is safe to point at a development database.
+
+Run from VALORS-Bot-API/:
+    python -m benchmarks.search --database-url postgresql+asyncpg://... [--users 100000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import string
+import time
+
+from benchmarks.utils import percentile
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models import Base, Users
+from app.utils.database import get_users, search_users, total_user_count
+
+SYLLABLES = ['ka', 'ri', 'to', 'mu', 'zen', 'val', 'or', 'shi', 'dra', 'gon', 'lux', 'nyx', 'ra', 'vex', 'qu']
+
+
+def synthetic_usernames(count: int, rng: random.Random):
+    seen = set()
+    while len(seen) < count:
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.3:
+            name += str(rng.randint(0, 9999))
+        if rng.random() < 0.2:
+            name += '_' + rng.choice(string.ascii_lowercase)
+        seen.add(name)
+    return list(seen)
+
+
+async def timed(db: AsyncSession, call, terms):
+    samples = []
+    for term in terms:
+        start = time.perf_counter()
+        await call(db, term)
+        samples.append(time.perf_counter() - start)
+    return {
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+async def list_page(db, term):
+    # What /user/all does per keystroke
+    await get_users(db, search=term, limit=20)
+    await total_user_count(db, search=term)
+
+
+async def run(database_url: str, user_count: int, schema: str, seed: int) -> dict:
+    rng = random.Random(seed)
+    engine = create_async_engine(database_url).execution_options(
+        schema_translate_map={'valors_league': schema})
+    tables = [table for table in Base.metadata.tables.values() if table.schema == 'valors_league']
+    users_index = next(index for index in Users.__table__.indexes if index.name == 'ix_users_username_trgm')
+
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+        await conn.exec_driver_sql(f'CREATE SCHEMA {schema}')
+        await conn.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        await conn.run_sync(Base.metadata.create_all, tables=tables)
+
+    usernames = synthetic_usernames(user_count, rng)
+    async with engine.begin() as conn:
+        await conn.execute(insert(Users), [
+            {"discord_id": str(10**17 + i), "email": f"user{i}@bench.invalid", "username": name}
+            for i, name in enumerate(usernames)])
+        await conn.exec_driver_sql(f'ANALYZE {schema}.users')
+
+    terms = [name[start:start + rng.randint(3, 5)]
+             for name in rng.sample(usernames, 50)
+             for start in [rng.randint(0, max(0, len(name) - 3))]]
+
+    results = {"users": user_count, "terms": len(terms)}
+    try:
+        async with AsyncSession(engine) as db:
+            await db.execute(text(f'DROP INDEX {schema}.ix_users_username_trgm'))
+            await db.commit()
+            results["list_page_seq_scan"] = await timed(db, list_page, terms)
+
+            await db.run_sync(lambda session: users_index.create(session.connection()))
+            await db.commit()
+            await db.execute(text(f'ANALYZE {schema}.users'))
+            results["list_page_trigram"] = await timed(db, list_page, terms)
+            results["ranked_search_trigram"] = await timed(
+                db, lambda session, term: search_users(session, term, limit=20), terms)
+    finally:
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+        await engine.dispose()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--schema', default='valors_bench')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.database_url, args.users, args.schema, args.seed)), indent=2))
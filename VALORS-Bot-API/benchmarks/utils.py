@@ -0,0 +1,74 @@
+import asyncio
+import os
+import socket
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List
+
+# config.py refuses to import without these, benchmarks never talk to Discord for real
+os.environ.setdefault('DISCORD_GUILD_ID', '1')
+os.environ.setdefault('DISCORD_BOT_ID', '1')
+os.environ.setdefault('DISCORD_CLIENT_ID', '1')
+os.environ.setdefault('API_TOKEN', 'bench-token')
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def drive(call: Callable, total: int, concurrency: int) -> Dict[str, float]:
+    """Runs `call` `total` times across `concurrency` workers and summarizes latency."""
+    latencies: List[float] = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+@asynccontextmanager
+async def serve(app, host: str = '127.0.0.1', lifespan: str = 'off'):
+    """Serves an ASGI app with uvicorn on a free local port, yielding its base URL.
+
+    With `lifespan='on'` the app's startup and shutdown handlers run as well.
+    """
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind((host, 0))
+    # Slow endpoints leave pooled client connections idle longer than uvicorn's default 5s
+    server = uvicorn.Server(uvicorn.Config(app, log_level='error', lifespan=lifespan, timeout_keep_alive=60))
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        if task.done():
+            # Startup failed, uvicorn gave up before listening
+            sock.close()
+            await task
+            raise RuntimeError('Server exited during startup')
+        await asyncio.sleep(0.01)
+    try:
+        yield f'http://{host}:{sock.getsockname()[1]}'
+    finally:
+        server.should_exit = True
+        await task
+        sock.close()
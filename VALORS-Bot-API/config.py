@@ -5,13 +5,32 @@ load_dotenv()
 
 class Config:
     LOG_LEVEL             = int(os.getenv('LOG_LEVEL', 2))
+    LOG_RATE_LIMIT        = float(os.getenv('LOG_RATE_LIMIT', 20))
+    LOG_RATE_BURST        = int(os.getenv('LOG_RATE_BURST', 50))
     UPDATE_API_KEY        = os.getenv('UPDATE_API_KEY')
+    UPDATE_PIPE_PATH      = os.getenv('UPDATE_PIPE_PATH', '/hostpipe/apipipe')
+    UPDATE_PIPE_TIMEOUT   = float(os.getenv('UPDATE_PIPE_TIMEOUT', 5))
+    UPDATE_DEDUP_WINDOW   = int(os.getenv('UPDATE_DEDUP_WINDOW', 60))
+    UPDATE_JOB_TTL        = int(os.getenv('UPDATE_JOB_TTL', 7 * 24 * 60 * 60))
     SECRET_KEY            = os.getenv('SECRET_KEY')
     REDIS_HOST            = os.getenv('REDIS_HOST', 'localhost')
     REDIS_PORT            = int(os.getenv('REDIS_PORT', 6379))
     DATABASE_URL          = os.getenv('DATABASE_URL')
+    DB_POOL_SIZE          = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW       = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT       = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE       = int(os.getenv('DB_POOL_RECYCLE', -1))
+    DB_POOL_PRE_PING      = os.getenv('DB_POOL_PRE_PING', 'false').lower() in ('1', 'true', 'yes')
+    DB_SLOW_QUERY_MS      = float(os.getenv('DB_SLOW_QUERY_MS', 200))
+    DB_N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', 10))
+    DB_QUERY_HEADER       = os.getenv('DB_QUERY_HEADER', 'false').lower() in ('1', 'true', 'yes')
+    DB_QUERY_BUDGET_ENFORCE = os.getenv('DB_QUERY_BUDGET_ENFORCE', 'false').lower() in ('1', 'true', 'yes')
     API_TOKEN             = os.getenv('API_TOKEN')
 
+    SESSION_CACHE_SIZE      = int(os.getenv('SESSION_CACHE_SIZE', 10000))
+    SESSION_CACHE_LOCAL_TTL = int(os.getenv('SESSION_CACHE_LOCAL_TTL', 30))
+    SESSION_CACHE_REDIS_TTL = int(os.getenv('SESSION_CACHE_REDIS_TTL', 300))
+
     DISCORD_API_ENDPOINT  = os.getenv('DISCORD_API_ENDPOINT', 'https://discord.com/api/v10')
     DISCORD_GUILD_ID      = int(os.getenv('DISCORD_GUILD_ID'))
     DISCORD_REDIRECT_URI  = os.getenv('DISCORD_REDIRECT_URI')
@@ -21,9 +40,24 @@ class Config:
 
     DISCORD_CLIENT_ID     = int(os.getenv('DISCORD_CLIENT_ID'))
     DISCORD_CLIENT_TOKEN  = os.getenv('DISCORD_CLIENT_TOKEN')
+    AVATAR_FETCH_CONCURRENCY = int(os.getenv('AVATAR_FETCH_CONCURRENCY', 5))
+
+    LEADERBOARD_REFRESH_INTERVAL = float(os.getenv('LEADERBOARD_REFRESH_INTERVAL', 30))
+    LIST_TOTAL_CACHE_TTL  = int(os.getenv('LIST_TOTAL_CACHE_TTL', 60))
+    METRICS_PUBLISH_INTERVAL = float(os.getenv('METRICS_PUBLISH_INTERVAL', 5))
+    STREAM_BATCH_SIZE     = int(os.getenv('STREAM_BATCH_SIZE', 500))
+    RANK_INDEX_TTL        = float(os.getenv('RANK_INDEX_TTL', 300))
+    COMMANDS_REFRESH_INTERVAL = float(os.getenv('COMMANDS_REFRESH_INTERVAL', 900))
+    COMMANDS_REDEPLOY_WINDOW = float(os.getenv('COMMANDS_REDEPLOY_WINDOW', 600))
+    COMMANDS_REDEPLOY_REFRESH_INTERVAL = float(os.getenv('COMMANDS_REDEPLOY_REFRESH_INTERVAL', 30))
 
     UPLOAD_DIR            = os.getenv('UPLOAD_DIR', '/cdn')
     CDN_BASE_URL          = os.getenv('CDN_BASE_URL', 'http://localhost')
+    UPLOAD_MAX_BYTES      = int(os.getenv('UPLOAD_MAX_BYTES', 5 * 1024 * 1024))
+    UPLOAD_WORKERS        = int(os.getenv('UPLOAD_WORKERS', 4))
+    LOGO_VARIANT_SIZES    = [int(size) for size in os.getenv('LOGO_VARIANT_SIZES', '24,64,256').split(',')]
+    LOGO_VARIANT_QUALITY  = int(os.getenv('LOGO_VARIANT_QUALITY', 80))
+    IMAGE_WORKERS         = int(os.getenv('IMAGE_WORKERS', 2))
 
     DISCORD_DEFAULT_PFP   = "https://discord.com/assets/6debd47ed13483642cf09e832ed0bc1b.png"
 
@@ -0,0 +1,7 @@
+import os
+
+# config reads these at import, any value will do for tests
+os.environ.setdefault('DISCORD_GUILD_ID', '1')
+os.environ.setdefault('DISCORD_BOT_ID', '1')
+os.environ.setdefault('DISCORD_CLIENT_ID', '1')
+os.environ.setdefault('API_TOKEN', 'test-token')
@@ -0,0 +1,58 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import config
+from app.utils import query_stats
+from app.utils.query_stats import QueryBudgetExceeded, query_budget
+
+pytest.importorskip('aiosqlite')
+
+
+@pytest.fixture
+def client():
+    engine = create_async_engine('sqlite+aiosqlite://')
+    query_stats.instrument_engine(engine)
+    app = FastAPI()
+
+    @app.middleware('http')
+    async def track_queries(request: Request, call_next):
+        token = query_stats.start()
+        try:
+            return await call_next(request)
+        finally:
+            query_stats.finish(token, request.method, request.url.path)
+
+    @app.get('/queries/{count}')
+    @query_budget(2)
+    async def run_queries(count: int):
+        async with engine.connect() as conn:
+            for _ in range(count):
+                await conn.execute(text('SELECT 1'))
+        return {'count': count}
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def enforce(monkeypatch):
+    monkeypatch.setattr(config, 'DB_QUERY_BUDGET_ENFORCE', True)
+
+
+def test_within_budget(client, enforce):
+    response = client.get('/queries/2')
+    assert response.status_code == 200
+    assert response.json() == {'count': 2}
+
+
+def test_over_budget_fails_the_request(client, enforce):
+    with pytest.raises(QueryBudgetExceeded, match='ran 3 queries, budget is 2'):
+        client.get('/queries/3')
+
+
+def test_over_budget_is_only_logged_unless_enforced(client, monkeypatch):
+    monkeypatch.setattr(config, 'DB_QUERY_BUDGET_ENFORCE', False)
+    assert client.get('/queries/3').status_code == 200